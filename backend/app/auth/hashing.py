@@ -0,0 +1,67 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from app.metrics import Histogram
+
+# bcrypt libera el GIL, así que un pool de hilos acotado basta para sacarlo del event loop
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Trabajos que pueden esperar turno además de los que están corriendo
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+_in_flight = 0
+
+queue_wait = Histogram()
+hash_time = Histogram()
+rejected = 0
+
+
+def _release():
+    global _in_flight
+    _in_flight -= 1
+
+
+async def run_hash(fn, *args):
+    # Rechaza rápido si el pool está lleno en vez de encolar sin límite
+    global _in_flight, rejected
+    if _in_flight >= HASH_WORKERS + HASH_QUEUE_SIZE:
+        rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, intenta de nuevo",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, started, time.perf_counter()
+
+    # Se descuenta cuando el trabajo termina en el pool, no cuando deja de esperarlo el request:
+    # si el cliente se desconecta, el hash sigue ocupando un hilo hasta terminar
+    loop = asyncio.get_running_loop()
+    _in_flight += 1
+    future = _executor.submit(job)
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(_release))
+    result, started, finished = await asyncio.wrap_future(future)
+
+    queue_wait.observe(started - submitted)
+    hash_time.observe(finished - started)
+    return result
+
+
+def stats():
+    return {
+        "workers": HASH_WORKERS,
+        "queue_size": HASH_QUEUE_SIZE,
+        "in_flight": _in_flight,
+        "rejected": rejected,
+        "queue_wait_seconds": queue_wait.snapshot(),
+        "hash_seconds": hash_time.snapshot(),
+    }
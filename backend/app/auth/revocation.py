@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database import async_session
+from app.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_FP_RATE = float(os.getenv("REVOCATION_BLOOM_FP_RATE", "0.001"))
+# Cada cuánto se reconstruye el filtro desde la tabla (revocaciones hechas en otros workers)
+REVOCATION_REBUILD_INTERVAL = float(os.getenv("REVOCATION_REBUILD_INTERVAL", "30"))
+
+
+class BloomFilter:
+    # Sin falsos negativos: "no está" es definitivo, "puede estar" se confirma en la tabla
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Doble hashing (Kirsch-Mitzenmacher) sobre un solo blake2b
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+
+    def __init__(self):
+        self._bloom = BloomFilter(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_FP_RATE)
+        self.bloom_hits = 0
+        self.confirmed = 0
+        self.checks = 0
+        self.last_rebuild = None
+        self._revoked_during_rebuild = None
+
+    async def rebuild(self):
+        # Purga lo vencido y arma un filtro nuevo con lo vigente; el cambio es atómico
+        now = datetime.utcnow()
+        self._revoked_during_rebuild = []
+        try:
+            async with async_session() as db:
+                await db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+                await db.commit()
+                bloom = BloomFilter(REVOCATION_BLOOM_CAPACITY, REVOCATION_BLOOM_FP_RATE)
+                result = await db.stream_scalars(
+                    select(RevokedToken.jti)
+                    .where(RevokedToken.expires_at >= now)
+                    .execution_options(yield_per=5000)
+                )
+                async for jti in result:
+                    bloom.add(jti)
+            # Revocaciones de este worker que pudieron no entrar en la lectura
+            for jti in self._revoked_during_rebuild:
+                bloom.add(jti)
+        finally:
+            self._revoked_during_rebuild = None
+        self._bloom = bloom
+        self.last_rebuild = now
+
+    async def revoke(self, db, jti: str, user_id: int, expires_at: datetime):
+        # Lo guarda en la transacción del llamador y lo marca ya en el filtro de este worker
+        await db.execute(
+            insert(RevokedToken)
+            .values(jti=jti, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing()
+        )
+        self._bloom.add(jti)
+        if self._revoked_during_rebuild is not None:
+            self._revoked_during_rebuild.append(jti)
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.checks += 1
+        # Hasta la primera reconstrucción el filtro está vacío: se consulta siempre la tabla
+        if self.last_rebuild is not None and jti not in self._bloom:
+            return False
+        self.bloom_hits += 1
+        async with async_session() as db:
+            result = await db.execute(select(RevokedToken.jti).where(RevokedToken.jti == jti))
+            revoked = result.scalar() is not None
+        if revoked:
+            self.confirmed += 1
+        return revoked
+
+    async def run_rebuilder(self):
+        while True:
+            await asyncio.sleep(REVOCATION_REBUILD_INTERVAL)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("no se pudo reconstruir la lista de tokens revocados")
+
+    def stats(self):
+        return {
+            "bloom_bits": self._bloom.size,
+            "bloom_hashes": self._bloom.hashes,
+            "bloom_items": self._bloom.count,
+            "checks": self.checks,
+            "bloom_hits": self.bloom_hits,
+            "confirmed_revoked": self.confirmed,
+            "false_positives": self.bloom_hits - self.confirmed,
+            "last_rebuild": self.last_rebuild,
+        }
+
+
+revocation_list = RevocationList()
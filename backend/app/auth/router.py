@@ -1,13 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from jose import jwt, JWTError
+from sqlalchemy import delete, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app import schemas, models, database
-from app.auth.utils import hash_password, verify_password, create_access_token
+from app.auth.revocation import revocation_list
+from app.auth.throttle import client_ip, login_throttle
+from app.auth.utils import (
+    ALGORITHM,
+    REFRESH_REUSE_GRACE_SECONDS,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    SECRET_KEY,
+    create_access_token,
+    create_refresh_token,
+    hash_password_async,
+    hash_token,
+    verify_and_update_password_async,
+)
+from app.auth_module import invalidate_principal
+from datetime import datetime, timedelta
 from fastapi.responses import JSONResponse
+import secrets
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+
+def _token_claims(user_id: int, email: str, token_version: int) -> dict:
+    return {"sub": email, "uid": user_id, "ver": token_version}
+
+
+def _set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    # ✅ Establece la cookie con el JWT
+    response.set_cookie(
+        key="token",
+        value=access_token,
+        httponly=True,
+        samesite="Lax",
+        secure=False,  # Cambia a True si usas HTTPS
+    )
+    # El refresh solo viaja a /auth, no en cada request
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        httponly=True,
+        samesite="Lax",
+        secure=False,
+        path="/auth",
+    )
+
+
+def _clear_auth_cookies(response: Response):
+    response.delete_cookie("token")
+    response.delete_cookie("refresh_token", path="/auth")
+
 @router.post("/register", response_model=schemas.UserOut)
 async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_db)):
     result = await db.execute(select(models.User).where(models.User.email == user.email))
@@ -15,7 +61,7 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database
     if existing_user:
         raise HTTPException(status_code=400, detail="Email ya registrado")
 
-    hashed_pw = hash_password(user.password)
+    hashed_pw = await hash_password_async(user.password)
     new_user = models.User(username=user.username, email=user.email, hashed_password=hashed_pw)
     db.add(new_user)
     await db.commit()
@@ -24,21 +70,185 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database
 
 
 @router.post("/login", response_model=schemas.Token)
-async def login(user: schemas.UserLogin, db: AsyncSession = Depends(database.get_db), response: Response = None):
+async def login(user: schemas.UserLogin, request: Request, db: AsyncSession = Depends(database.get_db), response: Response = None):
+    # Antes de cualquier consulta o hash: rechaza emails/IPs con demasiados fallos recientes
+    ip = client_ip(request)
+    login_throttle.check(user.email, ip)
+
     result = await db.execute(select(models.User).where(models.User.email == user.email))
     db_user = result.scalars().first()
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user:
+        login_throttle.record_failure(user.email, ip)
+        raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    valid, new_hash = await verify_and_update_password_async(user.password, db_user.hashed_password)
+    if not valid:
+        login_throttle.record_failure(user.email, ip)
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+    login_throttle.record_success(user.email, had_failures=bool(db_user.failed_logins))
 
-    token = create_access_token(data={"sub": db_user.email})
+    # Hash con parámetros viejos (costo o esquema): se reemplaza sin pedir cambio de clave
+    if new_hash:
+        db_user.hashed_password = new_hash
 
-    # ✅ Establece la cookie con el JWT
-    response.set_cookie(
-        key="token",
-        value=token,
-        httponly=True,
-        samesite="Lax",
-        secure=False,  # Cambia a True si usas HTTPS
+    claims = _token_claims(db_user.id, db_user.email, db_user.token_version)
+    token = create_access_token(data=claims)
+    # Una sesión de refresh por login: cada dispositivo rota su propio token
+    session_id = secrets.token_urlsafe(32)
+    refresh_token, refresh_hash = create_refresh_token(data={**claims, "sid": session_id})
+    now = datetime.utcnow()
+    await db.execute(
+        delete(models.RefreshSession)
+        .where(models.RefreshSession.user_id == db_user.id)
+        .where(models.RefreshSession.expires_at < now)
     )
+    await db.execute(
+        insert(models.RefreshSession).values(
+            id=session_id,
+            user_id=db_user.id,
+            token_hash=refresh_hash,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    await db.commit()
+
+    _set_auth_cookies(response, token, refresh_token)
 
     return schemas.Token(access_token=token, token_type="bearer")
+
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh(request: Request, response: Response, db: AsyncSession = Depends(database.get_db)):
+    raw = request.cookies.get("refresh_token")
+    if not raw:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    try:
+        payload = jwt.decode(raw, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    if (
+        payload.get("type") != "refresh"
+        or payload.get("uid") is None
+        or not payload.get("jti")
+        or not payload.get("sid")
+    ):
+        raise HTTPException(status_code=401, detail="Token inválido")
+
+    user_id, email, version = payload["uid"], payload["sub"], payload.get("ver", 0)
+    session_id, presented = payload["sid"], hash_token(payload["jti"])
+    claims = _token_claims(user_id, email, version)
+    token = create_access_token(data=claims)
+    refresh_token, refresh_hash = create_refresh_token(data={**claims, "sid": session_id})
+    now = datetime.utcnow()
+    current_version = (
+        select(models.User.id)
+        .where(models.User.id == user_id)
+        .where(models.User.token_version == version)
+        .exists()
+    )
+
+    # Rotación atómica: solo gana quien presenta el refresh vigente de esta sesión
+    result = await db.execute(
+        update(models.RefreshSession)
+        .where(models.RefreshSession.id == session_id)
+        .where(models.RefreshSession.user_id == user_id)
+        .where(models.RefreshSession.token_hash == presented)
+        .where(models.RefreshSession.expires_at > now)
+        .where(current_version)
+        .values(
+            token_hash=refresh_hash,
+            previous_hash=presented,
+            rotated_at=now,
+            expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        .returning(models.RefreshSession.id)
+    )
+    if result.scalar() is not None:
+        await db.commit()
+        _set_auth_cookies(response, token, refresh_token)
+        return schemas.Token(access_token=token, token_type="bearer")
+
+    # Otra pestaña o request acaba de rotar este mismo token: no es robo. Se entrega un
+    # access token nuevo y se deja la cookie de refresh que puso el ganador
+    result = await db.execute(
+        select(models.RefreshSession.id)
+        .where(models.RefreshSession.id == session_id)
+        .where(models.RefreshSession.user_id == user_id)
+        .where(models.RefreshSession.previous_hash == presented)
+        .where(models.RefreshSession.rotated_at > now - timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS))
+        .where(current_version)
+    )
+    if result.scalar() is not None:
+        response.set_cookie(key="token", value=token, httponly=True, samesite="Lax", secure=False)
+        return schemas.Token(access_token=token, token_type="bearer")
+
+    # Reuso de un refresh viejo de una sesión viva con la versión vigente: se asume robado y se
+    # invalidan todos los tokens y sesiones del usuario. Un token de una sesión cerrada, vencida
+    # o de una versión anterior solo recibe 401: si no, reenviarlo cerraría todas las sesiones
+    result = await db.execute(
+        select(models.RefreshSession.id)
+        .where(models.RefreshSession.id == session_id)
+        .where(models.RefreshSession.user_id == user_id)
+        .where(models.RefreshSession.token_hash != presented)
+        .where(models.RefreshSession.expires_at > now)
+        .where(current_version)
+    )
+    if result.scalar() is not None:
+        bumped = await db.execute(
+            update(models.User)
+            .where(models.User.id == user_id)
+            .where(models.User.token_version == version)
+            .values(token_version=models.User.token_version + 1)
+            .returning(models.User.id)
+        )
+        if bumped.scalar() is not None:
+            await db.execute(
+                delete(models.RefreshSession).where(models.RefreshSession.user_id == user_id)
+            )
+        await db.commit()
+        invalidate_principal(email)
+
+    failure = JSONResponse(status_code=401, content={"detail": "Token inválido"})
+    _clear_auth_cookies(failure)
+    return failure
+
+
+@router.post("/logout")
+async def logout(request: Request, db: AsyncSession = Depends(database.get_db)):
+    # Revoca el access token actual y la sesión de refresh de este dispositivo; un token vencido o inválido no hace falta revocarlo
+    token = request.cookies.get("token")
+    payload = None
+    if token:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            payload = None
+
+    if payload and payload.get("uid") is not None:
+        if payload.get("jti"):
+            await revocation_list.revoke(
+                db,
+                jti=payload["jti"],
+                user_id=payload["uid"],
+                expires_at=datetime.utcfromtimestamp(payload["exp"]),
+            )
+        await db.commit()
+        invalidate_principal(payload["sub"])
+
+    # Cierra solo la sesión de este dispositivo (la cookie de refresh viaja a /auth)
+    raw_refresh = request.cookies.get("refresh_token")
+    if raw_refresh:
+        try:
+            refresh_payload = jwt.decode(raw_refresh, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            refresh_payload = {}
+        if refresh_payload.get("sid"):
+            await db.execute(
+                delete(models.RefreshSession)
+                .where(models.RefreshSession.id == refresh_payload["sid"])
+                .where(models.RefreshSession.user_id == refresh_payload.get("uid"))
+            )
+            await db.commit()
+
+    response = JSONResponse(content={"msg": "Sesión cerrada"})
+    _clear_auth_cookies(response)
+    return response
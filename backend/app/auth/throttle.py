@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+
+from app.database import async_session
+
+logger = logging.getLogger(__name__)
+
+# Fallos permitidos dentro de la ventana antes de empezar a bloquear
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "900"))
+LOGIN_MAX_FAILURES_EMAIL = int(os.getenv("LOGIN_MAX_FAILURES_EMAIL", "5"))
+LOGIN_MAX_FAILURES_IP = int(os.getenv("LOGIN_MAX_FAILURES_IP", "20"))
+# Bloqueo progresivo: base * 2^(fallos extra), con tope
+LOGIN_BACKOFF_BASE_SECONDS = float(os.getenv("LOGIN_BACKOFF_BASE_SECONDS", "2"))
+LOGIN_BACKOFF_MAX_SECONDS = float(os.getenv("LOGIN_BACKOFF_MAX_SECONDS", "900"))
+LOGIN_TRACKED_KEYS = int(os.getenv("LOGIN_TRACKED_KEYS", "100000"))
+# Cada cuánto se escriben failed_logins/last_failed_login en users
+LOGIN_FLUSH_INTERVAL = float(os.getenv("LOGIN_FLUSH_INTERVAL", "5"))
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() in ("1", "true", "yes")
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class LoginThrottle:
+    # Ventana deslizante en memoria por email e IP; se consulta antes de tocar la base o bcrypt
+
+    def __init__(self):
+        self._failures = OrderedDict()  # clave -> deque de timestamps (monotonic)
+        self._blocked_until = {}
+        self._pending = {}  # email -> {"delta", "reset", "last"} para escribir en lote
+        self.rejected = 0
+        self.flushed_rows = 0
+
+    def _limit(self, key: str) -> int:
+        return LOGIN_MAX_FAILURES_IP if key.startswith("ip:") else LOGIN_MAX_FAILURES_EMAIL
+
+    def _recent(self, key: str, now: float):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] < now - LOGIN_WINDOW_SECONDS:
+            failures.popleft()
+        return failures
+
+    def check(self, email: str, ip: str):
+        now = time.monotonic()
+        retry_after = 0.0
+        for key in (f"email:{email.lower()}", f"ip:{ip}"):
+            until = self._blocked_until.get(key)
+            if until is None:
+                continue
+            if until <= now:
+                del self._blocked_until[key]
+            else:
+                retry_after = max(retry_after, until - now)
+        if retry_after:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados intentos fallidos, intenta más tarde",
+                headers={"Retry-After": str(int(retry_after) + 1)},
+            )
+
+    def record_failure(self, email: str, ip: str):
+        now = time.monotonic()
+        for key in (f"email:{email.lower()}", f"ip:{ip}"):
+            failures = self._recent(key, now)
+            if failures is None:
+                failures = self._failures[key] = deque()
+            failures.append(now)
+            self._failures.move_to_end(key)
+
+            extra = len(failures) - self._limit(key)
+            if extra >= 0:
+                delay = min(LOGIN_BACKOFF_BASE_SECONDS * (2 ** extra), LOGIN_BACKOFF_MAX_SECONDS)
+                self._blocked_until[key] = now + delay
+
+        while len(self._failures) > LOGIN_TRACKED_KEYS:
+            old_key, _ = self._failures.popitem(last=False)
+            self._blocked_until.pop(old_key, None)
+
+        pending = self._pending.setdefault(email, {"delta": 0, "reset": False, "last": None})
+        pending["delta"] += 1
+        pending["last"] = datetime.utcnow()
+
+    def record_success(self, email: str, had_failures: bool):
+        key = f"email:{email.lower()}"
+        self._failures.pop(key, None)
+        self._blocked_until.pop(key, None)
+        if had_failures or email in self._pending:
+            # El contador en la base vuelve a 0; last_failed_login se conserva
+            self._pending[email] = {"delta": 0, "reset": True, "last": None}
+
+    async def flush(self):
+        # Un solo UPDATE para todos los usuarios con fallos o resets pendientes
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        emails = list(pending)
+        try:
+            result = await self._write(pending, emails)
+        except Exception:
+            self._merge_back(pending)
+            raise
+        self.flushed_rows += result.rowcount
+
+    def _merge_back(self, pending):
+        # Lo que no se pudo escribir vuelve a la cola; un reset más nuevo tiene prioridad
+        for email, item in pending.items():
+            current = self._pending.get(email)
+            if current is None:
+                self._pending[email] = item
+            elif not current["reset"]:
+                current["delta"] += item["delta"]
+                current["reset"] = item["reset"]
+                current["last"] = current["last"] or item["last"]
+
+    async def _write(self, pending, emails):
+        async with async_session() as db:
+            result = await db.execute(
+                text(
+                    """
+                    UPDATE users AS u
+                    SET failed_logins = CASE WHEN v.reset THEN v.delta
+                                             ELSE COALESCE(u.failed_logins, 0) + v.delta END,
+                        last_failed_login = COALESCE(v.last, u.last_failed_login)
+                    FROM unnest(
+                        CAST(:emails AS TEXT[]),
+                        CAST(:deltas AS INT[]),
+                        CAST(:resets AS BOOLEAN[]),
+                        CAST(:lasts AS TIMESTAMP[])
+                    ) AS v(email, delta, reset, last)
+                    WHERE u.email = v.email
+                    """
+                ),
+                {
+                    "emails": emails,
+                    "deltas": [pending[e]["delta"] for e in emails],
+                    "resets": [pending[e]["reset"] for e in emails],
+                    "lasts": [pending[e]["last"] for e in emails],
+                },
+            )
+            await db.commit()
+        return result
+
+    async def run_flusher(self):
+        while True:
+            await asyncio.sleep(LOGIN_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:  # la base caída no debe matar el loop
+                logger.exception("no se pudo escribir failed_logins")
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            "tracked_keys": len(self._failures),
+            "blocked_keys": sum(1 for until in self._blocked_until.values() if until > now),
+            "pending_writes": len(self._pending),
+            "rejected": self.rejected,
+            "flushed_rows": self.flushed_rows,
+        }
+
+
+login_throttle = LoginThrottle()
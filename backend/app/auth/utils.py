@@ -1,13 +1,47 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
+import hashlib
 import os
+import secrets
+
+from app.auth.hashing import run_hash
 
 SECRET_KEY = os.getenv("SECRET_KEY", "mysecretkey123")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+# Segundos en que el refresh recién rotado se sigue aceptando (refresh concurrentes de la
+# misma sesión) antes de tratar su reuso como robo
+REFRESH_REUSE_GRACE_SECONDS = int(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "30"))
+
+# Parámetros de hash; python -m app.scripts.calibrate_hash sugiere valores para este hardware.
+# El primer esquema es el que se usa para hashes nuevos; el resto solo se verifica y se
+# rehashea en el siguiente login.
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_crypt_context(schemes=None, bcrypt_rounds=BCRYPT_ROUNDS, argon2_time_cost=ARGON2_TIME_COST,
+                        argon2_memory_cost=ARGON2_MEMORY_COST, argon2_parallelism=ARGON2_PARALLELISM):
+    schemes = list(schemes or PASSWORD_SCHEMES)
+    # Siempre se aceptan bcrypt existentes aunque el esquema por defecto sea otro
+    if "bcrypt" not in schemes:
+        schemes.append("bcrypt")
+    options = {"bcrypt__rounds": bcrypt_rounds}
+    if "argon2" in schemes:
+        options.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+pwd_context = build_crypt_context()
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -15,8 +49,37 @@ def hash_password(password: str):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password, hashed_password):
+    # (válido, hash_nuevo); hash_nuevo no es None si el guardado usa parámetros viejos
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Versiones para handlers async: corren en el pool acotado de app.auth.hashing
+async def hash_password_async(password: str):
+    return await run_hash(hash_password, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await run_hash(verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    return await run_hash(verify_and_update_password, plain_password, hashed_password)
+
 def create_access_token(data: dict):
+    # data trae sub (email), uid y ver (token_version) para no consultar users en cada request
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # jti permite revocar este token puntual (logout) antes de que expire
+    to_encode.update({"exp": expire, "iat": now, "type": "access", "jti": secrets.token_urlsafe(16)})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def create_refresh_token(data: dict):
+    # Devuelve (token, hash); en refresh_sessions solo se guarda el hash del jti
+    jti = secrets.token_urlsafe(32)
+    to_encode = data.copy()
+    now = datetime.utcnow()
+    expire = now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "iat": now, "type": "refresh", "jti": jti})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM), hash_token(jti)
+
+def hash_token(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
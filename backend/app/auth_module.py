@@ -1,35 +1,119 @@
 # app/auth.py
+import os
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.cache import TTLCache
 from app.database import get_db
 from app.models import User
 from app.schemas import Token
+from app.auth.revocation import revocation_list
 from app.auth.utils import SECRET_KEY, ALGORITHM, verify_password, hash_password, create_access_token
 
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# sub del token (email) -> CachedUser (copia inmutable, compartida entre requests)
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+
+def invalidate_principal(email: str):
+    principal_cache.pop(email)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    # Cambios en la fila (password_changed_at, token_version, email, ...) sacan al usuario del cache
+    invalidate_principal(target.email)
+    for old_email in inspect(target).attrs.email.history.deleted:
+        invalidate_principal(old_email)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_change(orm_execute_state):
+    # update(User)/delete(User) no pasan por after_update y no se sabe qué filas tocan: se vacía
+    # el cache. Los UPDATE con text() que cambien email o token_version llaman invalidate_principal
+    if (
+        (orm_execute_state.is_update or orm_execute_state.is_delete)
+        and orm_execute_state.bind_mapper is inspect(User)
+    ):
+        principal_cache.clear()
+
+
+@dataclass(frozen=True)
+class Principal:
+    # Lo que viaja en el access token: basta para los handlers que solo filtran por usuario
+    id: int
+    email: str
+    token_version: int
+
 
+@dataclass(frozen=True)
+class CachedUser:
+    # Solo los campos de identidad; quien necesite la fila completa la carga en su sesión
+    id: int
+    email: str
+    username: str
+    timezone: str | None
+    token_version: int
 
-async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)):
+
+def _decode_access_token(request: Request) -> dict:
     token = request.cookies.get("token")
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="No autenticado",
         )
-    
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email = payload.get("sub")
-        if user_email is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
+    if payload.get("sub") is None or payload.get("type", "access") != "access":
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return payload
+
+
+async def _check_not_revoked(payload: dict):
+    # El filtro de Bloom resuelve en memoria el caso común; solo sus aciertos van a la tabla
+    jti = payload.get("jti")
+    if jti and await revocation_list.is_revoked(jti):
+        raise HTTPException(status_code=401, detail="Token revocado")
+
 
-    result = await db.execute(select(User).filter(User.email == user_email))
-    user = result.scalars().first()
-    if user is None:
+async def _load_user(db: AsyncSession, user_email: str) -> CachedUser:
+    user = principal_cache.get(user_email)
+    if user is not None:
+        return user
+
+    result = await db.execute(
+        select(User.id, User.email, User.username, User.timezone, User.token_version)
+        .filter(User.email == user_email)
+    )
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=401, detail="Usuario no encontrado")
-    
-    return user
\ No newline at end of file
+
+    # Copia inmutable: ningún request puede modificar lo que ven los demás
+    user = CachedUser(**row._asdict())
+    principal_cache.set(user_email, user)
+    return user
+
+
+async def get_principal(request: Request, db: AsyncSession = Depends(get_db)) -> Principal:
+    # Camino rápido sin base de datos: uid y ver vienen firmados en el token
+    payload = _decode_access_token(request)
+    await _check_not_revoked(payload)
+    if payload.get("uid") is not None:
+        return Principal(id=payload["uid"], email=payload["sub"], token_version=payload.get("ver", 0))
+
+    # Tokens emitidos antes de incluir uid: se resuelven con el cache de usuarios
+    user = await _load_user(db, payload["sub"])
+    return Principal(id=user.id, email=user.email, token_version=user.token_version)
@@ -0,0 +1,50 @@
+from itertools import chain
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import mark_write
+from app.models import Budget, Goal, Transaction, User
+
+# Tablas cuyas escrituras cambian lo que muestra el dashboard
+VERSIONED_MODELS = (Transaction, Goal, Budget)
+
+
+def _bump_statement(user_ids):
+    return (
+        update(User)
+        .where(User.id.in_(sorted(user_ids)))
+        .values(data_version=User.data_version + 1)
+    )
+
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    # Lectura por clave primaria; no se toma del usuario cacheado para no servir ETags viejos
+    result = await db.execute(select(User.data_version).where(User.id == user_id))
+    return result.scalar() or 0
+
+
+async def bump_data_version(db: AsyncSession, *user_ids: int):
+    # Para escrituras por Core (insert masivo, COPY) que no pasan por el flush del ORM.
+    # Por la conexión, como el hook de flush: data_version no está en el cache de principals y
+    # un update(User) por la sesión dispararía do_orm_execute y lo vaciaría para todos
+    if user_ids:
+        connection = await db.connection()
+        await connection.execute(_bump_statement(set(user_ids)))
+        mark_write()
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session, flush_context):
+    # Cualquier escritura ORM sobre los modelos versionados incrementa users.data_version
+    # dentro de la misma transacción
+    user_ids = {
+        obj.user_id
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, VERSIONED_MODELS) and obj.user_id is not None
+    }
+    if user_ids:
+        session.connection().execute(_bump_statement(user_ids))
+        # Sus próximas lecturas van al primario hasta que la réplica se ponga al día
+        mark_write()
@@ -25,7 +25,8 @@ CREATE TABLE users (
     failed_logins INT DEFAULT 0,
     last_failed_login TIMESTAMP,
     password_changed_at TIMESTAMP,
-    refresh_token VARCHAR(255),
+    token_version INT NOT NULL DEFAULT 0,
+    data_version INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -61,14 +62,60 @@ CREATE TABLE transactions (
     currency CHAR(3) DEFAULT 'COP',
     tags TEXT[],
     status VARCHAR(20) DEFAULT 'completed',
-    created_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP DEFAULT NOW(),
+    fingerprint VARCHAR(64) -- huella de contenido para detectar duplicados
 );
 
 -- Índices
-CREATE INDEX idx_transactions_user ON transactions(user_id);
+CREATE INDEX ix_transactions_fingerprint ON transactions(fingerprint);
+CREATE INDEX ix_transactions_user_date ON transactions(user_id, date, id);
+CREATE INDEX ix_transactions_user_date_covering ON transactions(user_id, date) INCLUDE (type, amount);
 CREATE INDEX idx_transactions_date ON transactions(date);
 CREATE INDEX idx_transactions_category ON transactions(category_id);
 
+-- ==============================
+-- Tabla: daily_rollups (totales diarios para el dashboard)
+-- ==============================
+DROP TABLE IF EXISTS daily_rollups CASCADE;
+
+CREATE TABLE daily_rollups (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, type)
+);
+
+-- ==============================
+-- Tabla: monthly_balances (totales por mes, mantenidos en cada escritura)
+-- ==============================
+DROP TABLE IF EXISTS monthly_balances CASCADE;
+
+CREATE TABLE monthly_balances (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    income DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, year, month)
+);
+
+-- ==============================
+-- Tabla: monthly_snapshots (meses cerrados congelados)
+-- ==============================
+DROP TABLE IF EXISTS monthly_snapshots CASCADE;
+
+CREATE TABLE monthly_snapshots (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    income DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense DOUBLE PRECISION NOT NULL DEFAULT 0,
+    frozen_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (user_id, year, month)
+);
+
 -- ==============================
 -- Tabla: budgets
 -- ==============================
@@ -84,6 +131,8 @@ CREATE TABLE budgets (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+CREATE INDEX ix_budgets_user_period ON budgets(user_id, year, month);
+
 -- ==============================
 -- Tabla: transactions_log (auditoría)
 -- ==============================
@@ -107,6 +156,40 @@ CREATE TABLE transactions_log (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+CREATE INDEX ix_transactions_log_created_brin ON transactions_log USING brin (created_at) WITH (pages_per_range = 32);
+CREATE INDEX ix_transactions_log_tx_created ON transactions_log(transaction_id, created_at);
+
+-- ==============================
+-- Tabla: revoked_tokens (logout de JWT antes de expirar)
+-- ==============================
+DROP TABLE IF EXISTS revoked_tokens CASCADE;
+
+CREATE TABLE revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX ix_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+-- ==============================
+-- Tabla: refresh_sessions (un refresh token vigente por dispositivo)
+-- ==============================
+DROP TABLE IF EXISTS refresh_sessions CASCADE;
+
+CREATE TABLE refresh_sessions (
+    id VARCHAR(64) PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    token_hash VARCHAR(64) NOT NULL,
+    previous_hash VARCHAR(64),
+    rotated_at TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX ix_refresh_sessions_user_id ON refresh_sessions(user_id);
+
 -- ==============================
 -- Row Level Security
 -- ==============================
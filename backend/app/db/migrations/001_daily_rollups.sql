@@ -0,0 +1,13 @@
+-- ==============================
+-- Tabla: daily_rollups
+-- Totales diarios por (usuario, día, tipo) para el timeline del dashboard.
+-- Después de aplicar: python -m app.scripts.backfill_rollups
+-- ==============================
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, type)
+);
@@ -0,0 +1,14 @@
+-- ==============================
+-- Tabla: monthly_snapshots
+-- Totales por (usuario, año, mes) de meses cerrados. Los escribe app.rollups:
+-- al cerrar el mes (run_snapshot_freezer) y en escrituras con fecha atrasada.
+-- ==============================
+CREATE TABLE IF NOT EXISTS monthly_snapshots (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    income DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense DOUBLE PRECISION NOT NULL DEFAULT 0,
+    frozen_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (user_id, year, month)
+);
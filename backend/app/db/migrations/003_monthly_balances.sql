@@ -0,0 +1,24 @@
+-- ==============================
+-- Tabla: monthly_balances
+-- Ingresos/egresos por (usuario, año, mes) para /dashboard/summary.
+-- Se llena a partir de daily_rollups; python -m app.scripts.backfill_rollups
+-- la reconstruye desde cero.
+-- ==============================
+CREATE TABLE IF NOT EXISTS monthly_balances (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    income DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, year, month)
+);
+
+INSERT INTO monthly_balances (user_id, year, month, income, expense)
+SELECT user_id,
+       EXTRACT(YEAR FROM day)::INT,
+       EXTRACT(MONTH FROM day)::INT,
+       COALESCE(SUM(total) FILTER (WHERE type = 'income'), 0),
+       COALESCE(SUM(total) FILTER (WHERE type = 'expense'), 0)
+FROM daily_rollups
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,2 @@
+-- Versión de datos por usuario: cambia con cada escritura y alimenta los ETags del dashboard
+ALTER TABLE users ADD COLUMN IF NOT EXISTS data_version INT NOT NULL DEFAULT 0;
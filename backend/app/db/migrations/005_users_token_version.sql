@@ -0,0 +1,2 @@
+-- Versión de tokens por usuario: viaja en el JWT y permite invalidar todos los emitidos
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INT NOT NULL DEFAULT 0;
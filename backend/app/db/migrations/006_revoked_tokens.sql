@@ -0,0 +1,13 @@
+-- ==============================
+-- Tabla: revoked_tokens
+-- Access tokens revocados por /auth/logout. En memoria hay un filtro de Bloom
+-- reconstruido periódicamente; solo sus aciertos consultan esta tabla.
+-- ==============================
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_revoked_tokens_expires_at ON revoked_tokens(expires_at);
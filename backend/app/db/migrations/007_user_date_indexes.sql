@@ -0,0 +1,18 @@
+-- migrate: no-transaction
+-- Índices por usuario + rango de fechas para dashboard y listados. CONCURRENTLY no bloquea
+-- las escrituras pero no puede ir dentro de una transacción; si una sentencia falla queda
+-- un índice INVALID: bórralo con DROP INDEX CONCURRENTLY y vuelve a correr la migración.
+
+-- Filas del mes y paginación por (date, id) del usuario
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_date
+    ON transactions (user_id, date, id);
+
+-- Totales del dashboard con index-only scan (type y amount en la hoja del índice)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_user_date_covering
+    ON transactions (user_id, date) INCLUDE (type, amount);
+
+-- Cubierto por los dos anteriores: solo encarece los inserts
+DROP INDEX CONCURRENTLY IF EXISTS idx_transactions_user;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_budgets_user_period
+    ON budgets (user_id, year, month);
@@ -0,0 +1,8 @@
+-- goals no está en finflow.sql (la crea el ORM); el índice solo si la tabla existe.
+-- Tabla pequeña: un CREATE INDEX normal dentro de la transacción basta.
+DO $$
+BEGIN
+    IF to_regclass('goals') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS ix_goals_user ON goals (user_id);
+    END IF;
+END $$;
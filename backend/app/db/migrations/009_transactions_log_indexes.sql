@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+-- transactions_log solo crece y en orden de created_at: un BRIN resume cada rango de páginas
+-- con su mínimo y máximo y ocupa una fracción de lo que ocuparía un B-tree.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_log_created_brin
+    ON transactions_log USING brin (created_at) WITH (pages_per_range = 32);
+
+-- Historial de una transacción concreta
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_log_tx_created
+    ON transactions_log (transaction_id, created_at);
@@ -0,0 +1,3 @@
+-- Huella de contenido para detectar duplicados (reintentos, extractos solapados).
+-- Las filas existentes se completan con: python -m app.scripts.backfill_fingerprints
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64);
@@ -0,0 +1,5 @@
+-- migrate: no-transaction
+-- Detectar un duplicado es un solo probe en este índice, sin importar el tamaño de la tabla.
+-- (Si transactions ya está particionada, CONCURRENTLY no aplica: créalo sin esa palabra.)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_fingerprint
+    ON transactions (fingerprint);
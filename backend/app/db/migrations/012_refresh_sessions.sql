@@ -0,0 +1,21 @@
+-- ==============================
+-- Tabla: refresh_sessions
+-- Un refresh token vigente por sesión (dispositivo) en vez de uno por usuario:
+-- iniciar sesión en otro dispositivo ya no invalida el refresh del primero.
+-- previous_hash/rotated_at permiten aceptar el token recién rotado durante unos
+-- segundos (refresh concurrentes) sin tomarlo como robo.
+-- Los refresh emitidos con users.refresh_token dejan de valer: toca volver a iniciar sesión.
+-- ==============================
+CREATE TABLE IF NOT EXISTS refresh_sessions (
+    id VARCHAR(64) PRIMARY KEY,
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    token_hash VARCHAR(64) NOT NULL,
+    previous_hash VARCHAR(64),
+    rotated_at TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS ix_refresh_sessions_user_id ON refresh_sessions(user_id);
+
+ALTER TABLE users DROP COLUMN IF EXISTS refresh_token;
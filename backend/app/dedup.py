@@ -0,0 +1,92 @@
+import hashlib
+import json
+import math
+import os
+from datetime import datetime
+
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth_module import Principal, get_principal
+from app.cache import TTLCache
+from app.models import Transaction
+
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+# (usuario, ruta, Idempotency-Key) -> (hash del payload, respuesta); por proceso, como los
+# demás caches: un reintento que cae en otro worker lo frena el fingerprint en la base
+idempotency_cache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+_IN_FLIGHT = object()
+
+
+def normalize_description(description: str | None) -> str:
+    return " ".join((description or "").split()).lower()
+
+
+def transaction_fingerprint(user_id: int, moment, amount: float, tipo: str, description) -> str:
+    # Mismo usuario, día, monto en centavos, tipo y descripción normalizada => misma huella
+    day = moment.date() if isinstance(moment, datetime) else moment
+    cents = math.floor(abs(amount) * 100 + 0.5)
+    raw = f"{user_id}|{day.isoformat()}|{cents}|{tipo}|{normalize_description(description)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def find_duplicates(db: AsyncSession, user_id: int, fingerprints) -> dict[str, int]:
+    # Un probe por huella sobre ix_transactions_fingerprint -> {huella: id existente}
+    fingerprints = set(fingerprints)
+    if not fingerprints:
+        return {}
+    result = await db.execute(
+        select(Transaction.fingerprint, func.min(Transaction.id))
+        .where(Transaction.fingerprint.in_(fingerprints))
+        .where(Transaction.user_id == user_id)
+        .group_by(Transaction.fingerprint)
+    )
+    return dict(result.all())
+
+
+async def get_idempotency_key(
+    request: Request,
+    idempotency_key: str | None = Header(None, max_length=255),
+    current_user: Principal = Depends(get_principal),
+):
+    if not idempotency_key:
+        return None
+    return (current_user.id, request.url.path, idempotency_key)
+
+
+async def idempotent(key, payload, handler):
+    # Sin clave ejecuta tal cual. Con clave: la primera vez guarda la respuesta, los
+    # reintentos la reciben de nuevo sin volver a escribir
+    if key is None:
+        return await handler()
+
+    payload_hash = hashlib.sha256(
+        json.dumps(jsonable_encoder(payload), sort_keys=True).encode()
+    ).hexdigest()
+    entry = idempotency_cache.get(key)
+    if entry is not None:
+        stored_hash, body = entry
+        if stored_hash != payload_hash:
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key ya usada con otro contenido"
+            )
+        if body is _IN_FLIGHT:
+            raise HTTPException(
+                status_code=409, detail="Hay una solicitud en curso con esta Idempotency-Key"
+            )
+        return JSONResponse(content=body, headers={"Idempotent-Replayed": "true"})
+
+    idempotency_cache.set(key, (payload_hash, _IN_FLIGHT))
+    try:
+        body = jsonable_encoder(await handler())
+    except Exception:
+        # Si falló, el cliente puede reintentar con la misma clave
+        idempotency_cache.pop(key)
+        raise
+    idempotency_cache.set(key, (payload_hash, body))
+    return body
@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import datetime
+
+# Filas por FETCH del cursor del servidor: es todo lo que se tiene en memoria a la vez
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# Mismos nombres que acepta la importación CSV, para que un export se pueda reimportar
+EXPORT_COLUMNS = ["date", "description", "category", "type", "amount", "currency", "tags"]
+
+
+async def stream_rows(session_factory, query):
+    # Sesión propia: la del Depends ya se cerró cuando empieza a enviarse la respuesta.
+    # Si el cliente corta la descarga, al cerrar la sesión se cierra el cursor
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield rows
+
+
+async def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in batches:
+        for row in rows:
+            writer.writerow([
+                row.date.isoformat(sep=" "),
+                row.description or "",
+                row.category or "",
+                row.type,
+                f"{row.amount:.2f}",
+                row.currency or "",
+                "|".join(row.tags or []),
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_chunks(batches):
+    async for rows in batches:
+        yield "".join(
+            json.dumps({
+                "date": row.date.isoformat(),
+                "description": row.description,
+                "category": row.category,
+                "type": row.type,
+                "amount": row.amount,
+                "currency": row.currency,
+                "tags": row.tags or [],
+            }, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+
+# Anchos de Helvetica (milésimas de em) para alinear los montos a la derecha
+_HELVETICA_WIDTHS = {c: 556 for c in "0123456789$"} | {".": 278, ",": 278, "-": 333, " ": 278}
+
+
+def _pdf_text(value: str) -> bytes:
+    # Fuentes estándar con WinAnsiEncoding: lo que no está en cp1252 sale como "?"
+    raw = value.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _clip(value: str | None, length: int) -> str:
+    value = " ".join((value or "").split())
+    return value if len(value) <= length else value[: length - 1] + "…"
+
+
+class PdfTableWriter:
+    # PDF 1.4 escrito a medida que llegan las filas: cada página se emite (comprimida) en
+    # cuanto se llena y solo se guardan los offsets de los objetos para el xref final.
+    # Helvetica estándar, sin fuentes incrustadas
+
+    PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 en puntos
+    MARGIN = 40
+    FONT_SIZE = 9
+    LEADING = 14
+    # (título, x, caracteres máximos); el monto va alineado a la derecha en AMOUNT_RIGHT
+    COLUMNS = [("Date", 40, 10), ("Description", 100, 48), ("Category", 340, 20), ("Type", 450, 8)]
+    AMOUNT_RIGHT = 555
+
+    _CATALOG, _PAGES, _FONT, _FONT_BOLD = 1, 2, 3, 4
+
+    def __init__(self, title: str):
+        self.title = title
+        self.offsets = {}
+        self.position = 0
+        self.page_ids = []
+        self.pending = []
+        self.next_id = 5
+        top = self.PAGE_HEIGHT - self.MARGIN
+        self.rows_per_page = int((top - 2 * self.LEADING - self.MARGIN) / self.LEADING)
+
+    def _write(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def _object(self, obj_id: int, body: bytes) -> bytes:
+        self.offsets[obj_id] = self.position
+        return self._write(b"%d 0 obj\n" % obj_id + body + b"\nendobj\n")
+
+    def start(self) -> bytes:
+        out = self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        out += self._object(self._CATALOG, b"<< /Type /Catalog /Pages 2 0 R >>")
+        for obj_id, name in ((self._FONT, b"Helvetica"), (self._FONT_BOLD, b"Helvetica-Bold")):
+            out += self._object(
+                obj_id,
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /" + name
+                + b" /Encoding /WinAnsiEncoding >>",
+            )
+        return out
+
+    def add_rows(self, rows) -> bytes:
+        out = b""
+        for row in rows:
+            self.pending.append(row)
+            if len(self.pending) == self.rows_per_page:
+                out += self._page()
+        return out
+
+    def finish(self) -> bytes:
+        out = b""
+        if self.pending or not self.page_ids:
+            out += self._page()
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        out += self._object(
+            self._PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids))
+        )
+        xref_at = self.position
+        size = self.next_id
+        xref = [b"xref\n0 %d\n" % size, b"0000000000 65535 f \n"]
+        xref += [b"%010d 00000 n \n" % self.offsets[obj_id] for obj_id in range(1, size)]
+        out += self._write(b"".join(xref))
+        out += self._write(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref_at)
+        )
+        return out
+
+    def _line(self, y: float, cells) -> list[bytes]:
+        return [
+            b"BT %.1f %.1f Td (%s) Tj ET" % (x, y, _pdf_text(text)) for x, text in cells
+        ]
+
+    def _amount_cell(self, text: str) -> tuple[float, str]:
+        width = sum(_HELVETICA_WIDTHS.get(c, 556) for c in text) * self.FONT_SIZE / 1000
+        return self.AMOUNT_RIGHT - width, text
+
+    def _page(self) -> bytes:
+        number = len(self.page_ids) + 1
+        y = self.PAGE_HEIGHT - self.MARGIN
+        ops = [b"BT /F2 12 Tf %d %d Td (%s) Tj ET" % (self.MARGIN, y, _pdf_text(self.title))]
+        ops.append(
+            b"BT /F1 8 Tf %d %d Td (%s) Tj ET"
+            % (self.AMOUNT_RIGHT - 40, y, _pdf_text(f"Page {number}"))
+        )
+
+        y -= 2 * self.LEADING
+        ops.append(b"/F2 %d Tf" % self.FONT_SIZE)
+        header = [(x, name) for name, x, _ in self.COLUMNS] + [self._amount_cell("Amount")]
+        ops += self._line(y, header)
+        ops.append(b"%d %.1f m %d %.1f l S" % (self.MARGIN, y - 4, self.AMOUNT_RIGHT, y - 4))
+
+        ops.append(b"/F1 %d Tf" % self.FONT_SIZE)
+        for row in self.pending:
+            y -= self.LEADING
+            values = [
+                row.date.strftime("%Y-%m-%d"),
+                row.description,
+                row.category,
+                row.type.capitalize(),
+            ]
+            cells = [(x, _clip(value, length)) for (_, x, length), value in zip(self.COLUMNS, values)]
+            sign = "-" if row.type == "expense" else ""
+            cells.append(self._amount_cell(f"{sign}${row.amount:,.2f}"))
+            ops += self._line(y, cells)
+        self.pending = []
+
+        content = zlib.compress(b"\n".join(ops))
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        out = self._object(
+            content_id,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content)
+            + content + b"\nendstream",
+        )
+        out += self._object(
+            page_id,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+            % (self.PAGE_WIDTH, self.PAGE_HEIGHT, content_id),
+        )
+        return out
+
+
+async def pdf_chunks(batches):
+    writer = PdfTableWriter(f"Transactions - {datetime.utcnow():%Y-%m-%d}")
+    yield writer.start()
+    async for rows in batches:
+        chunk = writer.add_rows(rows)
+        if chunk:
+            yield chunk
+    yield writer.finish()
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", csv_chunks),
+    "ndjson": ("application/x-ndjson", ndjson_chunks),
+    "pdf": ("application/pdf", pdf_chunks),
+}
+
@@ -0,0 +1,51 @@
+import hashlib
+import os
+from datetime import datetime
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.cache import TTLCache
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# (usuario, ruta, query, versión, día) -> cuerpo ya serializable
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+
+def _cache_key(request: Request, user_id: int, version: int):
+    # El día UTC entra en la clave: el mes abierto y las ventanas de fechas cambian con él
+    today = datetime.utcnow().date().isoformat()
+    return (user_id, request.url.path, str(request.url.query), version, today)
+
+
+def make_etag(key) -> str:
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    # Comparación débil: W/"x" y "x" son equivalentes
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+async def versioned_response(request: Request, user_id: int, version: int, compute):
+    # 304 antes de cualquier agregación; si no, cache en memoria por versión de datos
+    key = _cache_key(request, user_id, version)
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(key)
+    if body is None:
+        body = jsonable_encoder(await compute())
+        response_cache.set(key, body)
+    return JSONResponse(body, headers=headers)
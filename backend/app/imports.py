@@ -0,0 +1,365 @@
+import codecs
+import csv
+import os
+import re
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.data_version import bump_data_version
+from app.dedup import transaction_fingerprint
+from app.pagination import naive_utc
+from app.rollups import add_to_rollups
+
+# Filas parseadas que se acumulan antes de cada COPY: la memoria no depende del archivo
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "5000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+# Errores de parseo que se devuelven con detalle (el resto solo se cuenta)
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+STAGING_COLUMNS = ["line", "date", "description", "amount", "type", "category", "fingerprint"]
+
+_HEADER_ALIASES = {
+    "date": "date", "fecha": "date",
+    "description": "description", "descripcion": "description", "descripción": "description",
+    "concepto": "description", "detalle": "description", "memo": "description",
+    "amount": "amount", "monto": "amount", "valor": "amount", "importe": "amount",
+    "type": "type", "tipo": "type",
+    "category": "category", "categoria": "category", "categoría": "category",
+}
+_TYPE_ALIASES = {
+    "income": "income", "ingreso": "income", "credit": "income", "credito": "income",
+    "crédito": "income", "abono": "income",
+    "expense": "expense", "egreso": "expense", "gasto": "expense", "debit": "expense",
+    "debito": "expense", "débito": "expense", "cargo": "expense",
+}
+_DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%Y %H:%M", "%d/%m/%y")
+
+
+def parse_date(value: str) -> datetime:
+    value = value.strip()
+    try:
+        # Con zona ("Z", "+02:00") se pasa a UTC: import_staging.date es TIMESTAMP sin zona
+        return naive_utc(datetime.fromisoformat(value))
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"fecha no reconocida: {value!r}")
+
+
+def _guess_decimal(cleaned: str) -> str | None:
+    # El último separador es el decimal, salvo que sea el único y le sigan exactamente
+    # 3 dígitos con parte entera distinta de 0: 1.234, $ 12.500 y 1,234 son miles
+    last = max(cleaned.rfind(","), cleaned.rfind("."))
+    if last < 0:
+        return None
+    sep = cleaned[last]
+    other = "," if sep == "." else "."
+    if other in cleaned:
+        return sep
+    if cleaned.count(sep) > 1:
+        return other
+    head, tail = cleaned[:last], cleaned[last + 1:]
+    if len(tail) == 3 and head.lstrip("-") not in ("", "0"):
+        return other
+    return sep
+
+
+def parse_amount(value: str, decimal: str | None = None) -> float:
+    # Acepta 1234.56, 1.234,56, 1,234.56, $ 12.500, -$ 1.234 y (123,45) como negativo.
+    # decimal: separador decimal ya conocido (coma en CSV con ";"); si no, se deduce
+    value = value.strip()
+    negative = value.startswith("(") and value.endswith(")")
+    cleaned = re.sub(r"[^\d,.\-]", "", value)
+    decimal = decimal or _guess_decimal(cleaned)
+    if decimal:
+        cleaned = cleaned.replace("." if decimal == "," else ",", "")
+        if cleaned.count(decimal) > 1:
+            raise ValueError(f"monto no reconocido: {value!r}")
+        cleaned = cleaned.replace(decimal, ".")
+    try:
+        amount = float(cleaned)
+    except ValueError:
+        raise ValueError(f"monto no reconocido: {value!r}") from None
+    return -abs(amount) if negative else amount
+
+
+def parse_ofx_date(value: str) -> datetime:
+    # YYYYMMDD[HHMM[SS]][.XXX][[±horas:TZ]]: con zona se pasa a UTC, sin ella se deja tal cual
+    digits = re.match(r"\d+", value)
+    digits = digits.group() if digits else ""
+    for length, fmt in ((14, "%Y%m%d%H%M%S"), (12, "%Y%m%d%H%M"), (8, "%Y%m%d")):
+        if len(digits) >= length:
+            moment = datetime.strptime(digits[:length], fmt)
+            break
+    else:
+        raise ValueError(f"fecha no reconocida: {value!r}")
+    offset = re.search(r"\[([+-]?\d+(?:\.\d+)?)", value)
+    if offset:
+        moment -= timedelta(hours=float(offset.group(1)))
+    return moment
+
+
+class _StatementParser:
+
+    def __init__(self):
+        self.rows = 0
+        self.error_count = 0
+        self.errors = []
+
+    def _error(self, line: int, detail: str):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"index": line, "detail": detail})
+
+    def _row(self, line: int, date, description, amount: float, tipo, category):
+        # Sin tipo explícito lo decide el signo; el monto se guarda siempre positivo
+        if tipo is None:
+            tipo = "expense" if amount < 0 else "income"
+        self.rows += 1
+        return (line, date, (description or "").strip()[:1000], abs(amount), tipo, category)
+
+
+class CsvStatementParser(_StatementParser):
+    # Recibe bytes por pedazos y devuelve las filas completas; un registro entre comillas
+    # puede cruzar líneas y pedazos, así que solo se parsea cuando las comillas cierran
+
+    def __init__(self):
+        super().__init__()
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._partial = ""
+        self._record = ""
+        self._columns = None
+        self._delimiter = ","
+        self._decimal = None
+        self._line = 0
+
+    def feed(self, chunk: bytes) -> list[tuple]:
+        return self._lines(self._decoder.decode(chunk))
+
+    def close(self) -> list[tuple]:
+        rows = self._lines(self._decoder.decode(b"", final=True) + "\n")
+        if self._record.strip():
+            self._error(self._line, "comillas sin cerrar al final del archivo")
+        return rows
+
+    def _lines(self, text_chunk: str) -> list[tuple]:
+        rows = []
+        lines = (self._partial + text_chunk).splitlines(keepends=True)
+        self._partial = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            self._line += 1
+            self._record += line
+            if self._record.count('"') % 2:
+                continue
+            record, self._record = self._record, ""
+            if not record.strip():
+                continue
+            row = self._parse_record(record)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    def _parse_record(self, record: str):
+        if self._columns is None:
+            header = record.strip()
+            self._delimiter = ";" if header.count(";") > header.count(",") else ","
+            # Con ";" el archivo viene de una configuración regional de coma decimal
+            self._decimal = "," if self._delimiter == ";" else None
+            names = next(csv.reader([header], delimiter=self._delimiter))
+            self._columns = [_HEADER_ALIASES.get(n.strip().lower()) for n in names]
+            missing = {"date", "description", "amount"} - set(self._columns)
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Faltan columnas en el CSV: {', '.join(sorted(missing))}",
+                )
+            return None
+
+        fields = next(csv.reader([record.rstrip("\r\n")], delimiter=self._delimiter))
+        values = {col: value for col, value in zip(self._columns, fields) if col}
+        try:
+            date = parse_date(values.get("date", ""))
+            amount = parse_amount(values.get("amount", ""), self._decimal)
+            tipo = None
+            if values.get("type", "").strip():
+                tipo = _TYPE_ALIASES.get(values["type"].strip().lower())
+                if tipo is None:
+                    raise ValueError(f"tipo no reconocido: {values['type']!r}")
+        except ValueError as e:
+            self._error(self._line, str(e))
+            return None
+        category = values.get("category", "").strip() or None
+        return self._row(self._line, date, values.get("description"), amount, tipo, category)
+
+
+class OfxStatementParser(_StatementParser):
+    # OFX 1.x (SGML) y 2.x (XML): procesa cada <STMTTRN>...</STMTTRN> en cuanto llega completo
+
+    _BLOCK = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+    _FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+    def __init__(self):
+        super().__init__()
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self._index = 0
+
+    def feed(self, chunk: bytes) -> list[tuple]:
+        self._buffer += self._decoder.decode(chunk)
+        rows = []
+        end = 0
+        for match in self._BLOCK.finditer(self._buffer):
+            end = match.end()
+            self._index += 1
+            row = self._parse_block(match.group(1))
+            if row is not None:
+                rows.append(row)
+        if end:
+            self._buffer = self._buffer[end:]
+        else:
+            # Lo anterior al último <STMTTRN> abierto ya no sirve
+            start = self._buffer.upper().rfind("<STMTTRN>")
+            self._buffer = self._buffer[start:] if start >= 0 else self._buffer[-16:]
+        return rows
+
+    def close(self) -> list[tuple]:
+        return self.feed(b"")
+
+    def _parse_block(self, block: str):
+        fields = {name.upper(): value.strip() for name, value in self._FIELD.findall(block)}
+        try:
+            date = parse_ofx_date(fields.get("DTPOSTED", ""))
+            # OFX no usa separador de miles: el único separador es el decimal
+            trnamt = fields.get("TRNAMT", "")
+            amount = parse_amount(trnamt, "," if "," in trnamt else ".")
+        except ValueError as e:
+            self._error(self._index, f"transacción OFX inválida: {e}")
+            return None
+        name, memo = fields.get("NAME", ""), fields.get("MEMO", "")
+        description = name if not memo or memo == name else f"{name} - {memo}" if name else memo
+        return self._row(self._index, date, description, amount, None, None)
+
+
+def statement_parser(fmt: str):
+    if fmt == "csv":
+        return CsvStatementParser()
+    if fmt == "ofx":
+        return OfxStatementParser()
+    raise HTTPException(status_code=400, detail="Formato no soportado (csv u ofx)")
+
+
+async def import_statement(
+    db: AsyncSession,
+    user_id: int,
+    chunks,
+    fmt: str,
+    default_category_id: int | None = None,
+    allow_duplicates: bool = False,
+):
+    # Parseo incremental -> COPY por lotes a una tabla temporal -> un INSERT ... SELECT
+    parser = statement_parser(fmt)
+
+    def with_fingerprints(rows):
+        # (line, date, description, amount, type, category) + huella
+        return [
+            row + (transaction_fingerprint(user_id, row[1], row[3], row[4], row[2]),)
+            for row in rows
+        ]
+
+    await db.execute(text(
+        """
+        CREATE TEMP TABLE import_staging (
+            line INT,
+            date TIMESTAMP,
+            description TEXT,
+            amount DOUBLE PRECISION,
+            type VARCHAR(50),
+            category TEXT,
+            fingerprint VARCHAR(64)
+        ) ON COMMIT DROP
+        """
+    ))
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    pg = raw.driver_connection
+
+    batch = []
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > IMPORT_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+        batch.extend(with_fingerprints(parser.feed(chunk)))
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            await pg.copy_records_to_table("import_staging", records=batch, columns=STAGING_COLUMNS)
+            batch = []
+    batch.extend(with_fingerprints(parser.close()))
+    if batch:
+        await pg.copy_records_to_table("import_staging", records=batch, columns=STAGING_COLUMNS)
+
+    duplicates = 0
+    if not allow_duplicates:
+        # Extractos solapados: fuera las filas que ya existen, un probe por huella
+        await db.execute(text("ANALYZE import_staging"))
+        result = await db.execute(
+            text(
+                """
+                DELETE FROM import_staging s
+                USING transactions t
+                WHERE t.fingerprint = s.fingerprint AND t.user_id = :user_id
+                """
+            ),
+            {"user_id": user_id},
+        )
+        duplicates = result.rowcount
+
+    # Categoría por id o por nombre (sin importar mayúsculas); si no coincide, la por defecto.
+    # Las filas que quedan sin categoría se descartan
+    result = await db.execute(
+        text(
+            """
+            WITH inserted AS (
+                INSERT INTO transactions (
+                    user_id, amount, type, category_id, description, date, fingerprint
+                )
+                SELECT CAST(:user_id AS INT), s.amount, s.type, COALESCE(c.id, :default_category_id),
+                       s.description, s.date, s.fingerprint
+                FROM import_staging s
+                LEFT JOIN LATERAL (
+                    SELECT id FROM categories
+                    WHERE id::text = s.category OR lower(name) = lower(s.category)
+                    ORDER BY id::text = s.category DESC
+                    LIMIT 1
+                ) c ON TRUE
+                WHERE COALESCE(c.id, :default_category_id) IS NOT NULL
+                ORDER BY s.line
+                RETURNING user_id, date, type, amount
+            )
+            SELECT user_id, date::date AS day, type, SUM(amount), COUNT(*)
+            FROM inserted
+            GROUP BY user_id, date::date, type
+            """
+        ),
+        {"user_id": user_id, "default_category_id": default_category_id},
+    )
+    # Rollups en bloque: una fila por (día, tipo), no por transacción
+    deltas = {(uid, day, tipo): (total, count) for uid, day, tipo, total, count in result.all()}
+    imported = sum(count for _, count in deltas.values())
+    if imported:
+        await add_to_rollups(db, deltas)
+        await bump_data_version(db, user_id)
+
+    return {
+        "imported": imported,
+        "duplicates": duplicates,
+        "without_category": parser.rows - duplicates - imported,
+        "error_count": parser.error_count,
+        "errors": parser.errors,
+    }
@@ -1,18 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app import models
-from app.database import engine
+from app import data_version  # registra el hook que versiona las escrituras
+from app import sql_log
+from app.database import ReadYourWritesMiddleware, engine, monitor_replica
 from app.auth.router import router as auth_router
+from app.auth.revocation import revocation_list
+from app.auth.throttle import login_throttle
+from app.partitions import run_partition_maintainer
+from app.rollups import run_snapshot_freezer
 from app.routes.dashboard import router as dashboard_router
 from app.routes.transaction import router as transactions
 from app.routes import goals
 from app.routes import categories  # ✅ importa el módulo, no el objeto
+from app.routes import metrics
+from app.routes import audit
+from app.routes import health
+from app.warmup import readiness, run_warmup
 
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = [
+        # Abre y prepara las conexiones del pool y arma el filtro de tokens revocados;
+        # /readyz pasa a 200 cuando termina (si la base no responde, reintenta)
+        asyncio.create_task(run_warmup()),
+        # Escribe en lote los contadores de logins fallidos
+        asyncio.create_task(login_throttle.run_flusher()),
+        asyncio.create_task(revocation_list.run_rebuilder()),
+        # Retraso de la réplica de lectura (no hace nada si no hay READ_DATABASE_URL)
+        asyncio.create_task(monitor_replica()),
+        # Particiones futuras de transactions (solo si la tabla está particionada)
+        asyncio.create_task(run_partition_maintainer()),
+        # Congela en monthly_snapshots los meses que se van cerrando
+        asyncio.create_task(run_snapshot_freezer()),
+    ]
+    yield
+    # Fuera de rotación mientras se apaga
+    readiness.ready = False
+    for task in background:
+        task.cancel()
+    await login_throttle.flush()
+    sql_log.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Ruta actual disponible para el log de consultas lentas
+app.add_middleware(sql_log.RouteContextMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +71,9 @@ app.include_router(dashboard_router)
 app.include_router(transactions)
 app.include_router(categories.router)  # ✅ usa el router
 app.include_router(goals.router)
+app.include_router(metrics.router)
+app.include_router(audit.router)
+app.include_router(health.router)
 
 @app.get("/")
 def root():
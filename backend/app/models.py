@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Integer, Numeric, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Date, Index, Integer, Numeric, String, Float, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -22,7 +22,10 @@ class User(Base):
     failed_logins = Column(Integer, default=0)
     last_failed_login = Column(DateTime)
     password_changed_at = Column(DateTime)
-    refresh_token = Column(String(255))
+    # Se incrementa para invalidar todos los tokens emitidos (reuso de refresh, cambio de clave)
+    token_version = Column(Integer, nullable=False, default=0)
+    # Se incrementa con cada escritura en transactions/goals/budgets (ETags del dashboard)
+    data_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # relaciones
@@ -47,11 +50,57 @@ class Transaction(Base):
     tags = Column(ARRAY(Text))
     status = Column(String(20), default="completed")
     created_at = Column(DateTime, default=datetime.utcnow)
+    # sha256 de usuario, día, monto, tipo y descripción normalizada (ver app/dedup.py)
+    fingerprint = Column(String(64), index=True)
 
     # Relaciones
     user = relationship("User", back_populates="transactions")
     category = relationship("Category", back_populates="transactions")  # 👈 queda más natural
 
+    __table_args__ = (
+        # Consultas por usuario + rango de fechas (dashboard, listados)
+        Index("ix_transactions_user_date", "user_id", "date", "id"),
+        Index(
+            "ix_transactions_user_date_covering",
+            "user_id",
+            "date",
+            postgresql_include=["type", "amount"],
+        ),
+    )
+
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+
+    # Totales diarios por usuario y tipo, se actualizan en la misma transacción que cada insert
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(String(50), primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class MonthlyBalance(Base):
+    __tablename__ = "monthly_balances"
+
+    # Totales del mes por usuario, mantenidos junto con daily_rollups en cada escritura
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    income = Column(Float, nullable=False, default=0)
+    expense = Column(Float, nullable=False, default=0)
+
+
+class MonthlySnapshot(Base):
+    __tablename__ = "monthly_snapshots"
+
+    # Totales congelados de meses ya cerrados; no se vuelven a calcular
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    income = Column(Float, nullable=False, default=0)
+    expense = Column(Float, nullable=False, default=0)
+    frozen_at = Column(DateTime, default=datetime.utcnow)
 
 
 
@@ -59,7 +108,7 @@ class Goal(Base):
     __tablename__ = "goals"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     goal_name = Column(String, nullable=False)
     target_amount = Column(Numeric(12, 2), nullable=False)
     deadline = Column(Date, nullable=False)
@@ -119,6 +168,8 @@ class Budget(Base):
 
     category = relationship("Category", back_populates="budgets")  # 👈 renombrado
 
+    __table_args__ = (Index("ix_budgets_user_period", "user_id", "year", "month"),)
+
 
 class TransactionLog(Base):
     __tablename__ = "transactions_log"
@@ -138,3 +189,38 @@ class TransactionLog(Base):
     new_date = Column(DateTime)
     action = Column(String(20), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Tabla de solo inserción, físicamente ordenada por created_at: BRIN en vez de B-tree
+        Index(
+            "ix_transactions_log_created_brin",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+        Index("ix_transactions_log_tx_created", "transaction_id", "created_at"),
+    )
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # jti de access tokens revocados antes de expirar (logout); se purgan al vencer
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow)
+
+
+class RefreshSession(Base):
+    __tablename__ = "refresh_sessions"
+
+    # Una fila por sesión iniciada (dispositivo); id es el claim sid del refresh token
+    id = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False)  # sha256 del jti vigente
+    # Token anterior a la última rotación: vale durante REFRESH_REUSE_GRACE_SECONDS
+    previous_hash = Column(String(64))
+    rotated_at = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,27 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+
+
+def naive_utc(moment: datetime | None) -> datetime | None:
+    # Las columnas son TIMESTAMP sin zona (UTC): "...Z" o "+02:00" se pasan a UTC sin zona
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    # Cursor opaco para keyset pagination: la posición (fecha, id) de la última fila entregada
+    raw = json.dumps([moment.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        moment, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return naive_utc(datetime.fromisoformat(moment)), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
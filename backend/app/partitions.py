@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+from datetime import date
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.rollups import add_months, current_month
+
+logger = logging.getLogger(__name__)
+
+# Particiones mensuales que se mantienen creadas por delante del mes actual
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "86400"))
+# Clave del advisory lock para que un solo worker haga DDL a la vez
+PARTITION_LOCK_KEY = 7301
+
+
+def partition_name(year: int, month: int) -> str:
+    return f"transactions_p{year:04d}{month:02d}"
+
+
+def partition_ddl(year: int, month: int, parent: str = "transactions") -> str:
+    start = date(year, month, 1)
+    end = date(*add_months(year, month, 1), 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(year, month)} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+async def is_partitioned(conn) -> bool:
+    result = await conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        "WHERE partrelid = to_regclass('transactions'))"
+    ))
+    return bool(result.scalar())
+
+
+async def ensure_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    # Crea las particiones del mes actual y los siguientes; no hace nada si la tabla no está
+    # particionada. Devuelve las que creó.
+    created = []
+    async with engine.connect() as conn:
+        if not await is_partitioned(conn):
+            return created
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        existing = set((await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'transactions'::regclass"
+        ))).scalars())
+
+        year, month = current_month()
+        for n in range(months_ahead + 1):
+            ym = add_months(year, month, n)
+            if partition_name(*ym) in existing:
+                continue
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text(partition_ddl(*ym)))
+                created.append(partition_name(*ym))
+            except Exception:
+                # Filas de ese mes ya en la partición default: hay que moverlas a mano
+                logger.exception("no se pudo crear la partición %s", partition_name(*ym))
+        await conn.commit()
+    return created
+
+
+async def run_partition_maintainer():
+    while True:
+        try:
+            created = await ensure_partitions()
+            if created:
+                logger.info("particiones creadas: %s", ", ".join(created))
+        except Exception:
+            logger.exception("no se pudieron crear las particiones de transactions")
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
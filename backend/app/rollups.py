@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models import DailyRollup, MonthlyBalance, MonthlySnapshot
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se congelan los meses cerrados sin snapshot (cambio de mes, backfill)
+MONTHLY_SNAPSHOT_INTERVAL = float(os.getenv("MONTHLY_SNAPSHOT_INTERVAL", "3600"))
+# Clave del advisory lock para que un solo worker congele a la vez
+MONTHLY_SNAPSHOT_LOCK_KEY = 7302
+# Claves por sentencia en los upserts de rollups: 5 parámetros por clave, lejos del tope de
+# 32767 de asyncpg aunque un extracto cubra años de historia diaria
+ROLLUP_UPSERT_CHUNK = 1000
+
+
+def _day(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _chunks(items: list, size: int = ROLLUP_UPSERT_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def add_months(year: int, month: int, n: int) -> tuple[int, int]:
+    index = year * 12 + (month - 1) + n
+    return index // 12, index % 12 + 1
+
+
+def current_month() -> tuple[int, int]:
+    today = datetime.utcnow()
+    return today.year, today.month
+
+
+async def add_to_rollups(db: AsyncSession, deltas: dict):
+    # deltas: {(user_id, day, type): (monto, cantidad)} -> upserts multi-fila por tramos.
+    # Claves ordenadas: dos escrituras concurrentes bloquean las filas en el mismo orden
+    if not deltas:
+        return
+    rows = [
+        {"user_id": user_id, "day": day, "type": tipo, "total": total, "count": count}
+        for (user_id, day, tipo), (total, count) in sorted(deltas.items())
+    ]
+    for chunk in _chunks(rows):
+        stmt = insert(DailyRollup).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyRollup.user_id, DailyRollup.day, DailyRollup.type],
+            set_={
+                "total": DailyRollup.total + stmt.excluded.total,
+                "count": DailyRollup.count + stmt.excluded.count,
+            },
+        )
+        await db.execute(stmt)
+
+    # Mismos deltas agregados por mes para monthly_balances
+    months = defaultdict(lambda: {"income": 0.0, "expense": 0.0})
+    for (user_id, day, tipo), (total, _) in deltas.items():
+        if tipo in ("income", "expense"):
+            months[(user_id, day.year, day.month)][tipo] += total
+    if not months:
+        return
+
+    month_rows = [
+        {"user_id": user_id, "year": year, "month": month, **totals}
+        for (user_id, year, month), totals in sorted(months.items())
+    ]
+    for chunk in _chunks(month_rows):
+        stmt = insert(MonthlyBalance).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MonthlyBalance.user_id, MonthlyBalance.year, MonthlyBalance.month],
+            set_={
+                "income": MonthlyBalance.income + stmt.excluded.income,
+                "expense": MonthlyBalance.expense + stmt.excluded.expense,
+            },
+        )
+        await db.execute(stmt)
+
+    # Escrituras con fecha en un mes cerrado: el snapshot se reescribe desde monthly_balances en
+    # la misma transacción (que ya tiene bloqueada esa fila), así nunca queda uno viejo
+    open_month = current_month()
+    closed = sorted(key for key in months if key[1:] < open_month)
+    for chunk in _chunks(closed):
+        await db.execute(_snapshot_upsert(chunk))
+
+
+def _snapshot_upsert(keys):
+    # Orden fijo por (user_id, year, month), igual que freeze_closed_months: sin deadlocks entre ellos
+    stmt = insert(MonthlySnapshot).from_select(
+        ["user_id", "year", "month", "income", "expense"],
+        select(
+            MonthlyBalance.user_id,
+            MonthlyBalance.year,
+            MonthlyBalance.month,
+            MonthlyBalance.income,
+            MonthlyBalance.expense,
+        )
+        .where(tuple_(MonthlyBalance.user_id, MonthlyBalance.year, MonthlyBalance.month).in_(keys))
+        .order_by(MonthlyBalance.user_id, MonthlyBalance.year, MonthlyBalance.month),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[MonthlySnapshot.user_id, MonthlySnapshot.year, MonthlySnapshot.month],
+        set_={"income": stmt.excluded.income, "expense": stmt.excluded.expense},
+    )
+
+
+async def record_transactions(db: AsyncSession, transactions):
+    # No hace commit: el llamador lo incluye en la misma transacción que el insert
+    await record_rows(
+        db,
+        ({"user_id": t.user_id, "date": t.date, "type": t.type, "amount": t.amount} for t in transactions),
+    )
+
+
+async def record_rows(db: AsyncSession, rows):
+    # Igual que record_transactions pero con dicts (inserts por Core, sin objetos ORM)
+    deltas = defaultdict(lambda: (0.0, 0))
+    for row in rows:
+        key = (row["user_id"], _day(row["date"] or datetime.utcnow()), row["type"])
+        total, count = deltas[key]
+        deltas[key] = (total + row["amount"], count + 1)
+    await add_to_rollups(db, dict(deltas))
+
+
+async def rebuild_rollups(db: AsyncSession, user_id: int | None = None):
+    # Reconstruye desde transactions; bloquea escrituras mientras corre para no perder inserts
+    await db.execute(text("LOCK TABLE transactions IN SHARE MODE"))
+    params = {}
+    user_filter = ""
+    if user_id is not None:
+        user_filter = "AND user_id = :user_id"
+        params["user_id"] = user_id
+    await db.execute(text(f"DELETE FROM daily_rollups WHERE TRUE {user_filter}"), params)
+    await db.execute(text(f"DELETE FROM monthly_snapshots WHERE TRUE {user_filter}"), params)
+    await db.execute(text(f"DELETE FROM monthly_balances WHERE TRUE {user_filter}"), params)
+    result = await db.execute(
+        text(
+            f"""
+            INSERT INTO daily_rollups (user_id, day, type, total, count)
+            SELECT user_id, date::date, type, SUM(amount), COUNT(*)
+            FROM transactions
+            WHERE date IS NOT NULL {user_filter}
+            GROUP BY user_id, date::date, type
+            """
+        ),
+        params,
+    )
+    await db.execute(
+        text(
+            f"""
+            INSERT INTO monthly_balances (user_id, year, month, income, expense)
+            SELECT user_id,
+                   EXTRACT(YEAR FROM day)::INT,
+                   EXTRACT(MONTH FROM day)::INT,
+                   COALESCE(SUM(total) FILTER (WHERE type = 'income'), 0),
+                   COALESCE(SUM(total) FILTER (WHERE type = 'expense'), 0)
+            FROM daily_rollups
+            WHERE TRUE {user_filter}
+            GROUP BY 1, 2, 3
+            """
+        ),
+        params,
+    )
+    await freeze_closed_months(db, user_id)
+    return result.rowcount
+
+
+async def month_balances(db: AsyncSession, user_id: int, months: list[tuple[int, int]]):
+    # Lectura por clave primaria de monthly_balances: una fila por mes pedido
+    totals = defaultdict(lambda: {"income": 0, "expense": 0})
+    if not months:
+        return totals
+    res = await db.execute(
+        select(MonthlyBalance.year, MonthlyBalance.month, MonthlyBalance.income, MonthlyBalance.expense)
+        .where(MonthlyBalance.user_id == user_id)
+        .where(tuple_(MonthlyBalance.year, MonthlyBalance.month).in_(months))
+    )
+    for year, month, income, expense in res.all():
+        totals[(year, month)] = {"income": income, "expense": expense}
+    return totals
+
+
+async def freeze_closed_months(db: AsyncSession, user_id: int | None = None) -> int:
+    # Congela desde monthly_balances los meses cerrados que aún no tienen snapshot. DO NOTHING:
+    # si una escritura con fecha atrasada ya dejó el suyo, ese es el vigente. No hace commit
+    year, month = current_month()
+    params = {"year": year, "month": month}
+    user_filter = ""
+    if user_id is not None:
+        user_filter = "AND user_id = :user_id"
+        params["user_id"] = user_id
+    result = await db.execute(
+        text(
+            f"""
+            INSERT INTO monthly_snapshots (user_id, year, month, income, expense)
+            SELECT user_id, year, month, income, expense
+            FROM monthly_balances
+            WHERE (year, month) < (:year, :month) {user_filter}
+            ORDER BY user_id, year, month
+            ON CONFLICT DO NOTHING
+            """
+        ),
+        params,
+    )
+    return result.rowcount
+
+
+async def run_snapshot_freezer():
+    # Al arrancar y luego cada MONTHLY_SNAPSHOT_INTERVAL; un solo worker por vez
+    while True:
+        try:
+            async with async_session() as db:
+                locked = (await db.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": MONTHLY_SNAPSHOT_LOCK_KEY}
+                )).scalar()
+                if locked:
+                    frozen = await freeze_closed_months(db)
+                    await db.commit()
+                    if frozen:
+                        logger.info("meses congelados en monthly_snapshots: %d", frozen)
+        except Exception:
+            logger.exception("no se pudieron congelar los meses cerrados")
+        await asyncio.sleep(MONTHLY_SNAPSHOT_INTERVAL)
+
+
+async def monthly_overview(db: AsyncSession, user_id: int, months: list[tuple[int, int]]):
+    # Solo lectura: meses cerrados desde monthly_snapshots; el mes abierto y los cerrados que
+    # aún no se congelaron, desde monthly_balances
+    open_month = current_month()
+    data = {ym: {"income": 0, "expense": 0} for ym in months}
+
+    frozen = set()
+    closed = [ym for ym in months if ym < open_month]
+    if closed:
+        res = await db.execute(
+            select(MonthlySnapshot)
+            .where(MonthlySnapshot.user_id == user_id)
+            .where(tuple_(MonthlySnapshot.year, MonthlySnapshot.month).in_(closed))
+        )
+        for snap in res.scalars().all():
+            data[(snap.year, snap.month)] = {"income": snap.income, "expense": snap.expense}
+            frozen.add((snap.year, snap.month))
+
+    live = [ym for ym in months if ym not in frozen and ym <= open_month]
+    if live:
+        balances = await month_balances(db, user_id, live)
+        for ym in live:
+            data[ym] = dict(balances[ym])
+
+    return data
@@ -0,0 +1,67 @@
+import os
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth_module import Principal, get_principal
+from app.database import get_read_db
+from app.models import TransactionLog
+from app.pagination import decode_cursor, encode_cursor, naive_utc
+from app.schemas import TransactionLogPage
+
+# Rango máximo por consulta: junto con el límite de página acota el costo de cada request
+AUDIT_MAX_RANGE_DAYS = int(os.getenv("AUDIT_MAX_RANGE_DAYS", "31"))
+
+router = APIRouter(prefix="/audit", tags=["Audit"])
+
+
+@router.get("/transactions", response_model=TransactionLogPage)
+async def get_audit_history(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    transaction_id: int | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Más recientes primero; keyset sobre (created_at, id) en vez de OFFSET
+    end = naive_utc(end) or datetime.utcnow()
+    start = naive_utc(start) or end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start debe ser anterior a end")
+    if end - start > timedelta(days=AUDIT_MAX_RANGE_DAYS):
+        raise HTTPException(
+            status_code=400,
+            detail=f"El rango no puede superar {AUDIT_MAX_RANGE_DAYS} días",
+        )
+
+    # created_at acotado por ambos lados: el BRIN descarta los rangos de páginas fuera de él
+    query = (
+        select(TransactionLog)
+        .where(TransactionLog.user_id == current_user.id)
+        .where(TransactionLog.created_at >= start)
+        .where(TransactionLog.created_at < end)
+    )
+    if transaction_id is not None:
+        query = query.where(TransactionLog.transaction_id == transaction_id)
+    if cursor:
+        after_created, after_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(TransactionLog.created_at, TransactionLog.id) < tuple_(after_created, after_id)
+        )
+
+    result = await db.execute(
+        query
+        .order_by(TransactionLog.created_at.desc(), TransactionLog.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
+from app.database import get_db, get_read_db, mark_write
 from app.models import Category
 from pydantic import BaseModel
 from datetime import datetime
@@ -12,7 +12,7 @@ from datetime import datetime
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 @router.get("/")
-async def get_categories(db: AsyncSession = Depends(get_db)):
+async def get_categories(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Category))
     categories = result.scalars().all()
     return categories
@@ -35,6 +35,8 @@ async def create_category(data: CategoryCreate, db: AsyncSession = Depends(get_d
     try:
         await db.commit()
         await db.refresh(category)
+        # Categories no está versionada: se marca a mano para que el listado la vea
+        mark_write()
     except IntegrityError:
         await db.rollback()
         raise HTTPException(status_code=400, detail="Category already exists")
@@ -1,59 +1,71 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, extract
+from sqlalchemy import func
 from datetime import datetime, timedelta
 
-from sqlalchemy.orm import selectinload
-
-
 
-from app.database import get_db
-from app.models import Transaction, User
-from app.auth_module import get_current_user
+from app.database import DB_POOL_SIZE, get_read_db, read_sessionmaker, run_in_session
+from app.models import DailyRollup, Transaction
+from app.auth_module import Principal, get_principal
+from app.data_version import get_data_version
+from app.http_cache import versioned_response
+from app.rollups import add_months, current_month, month_balances, monthly_overview
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+# Consultas del bundle en paralelo por worker (suman entre todos los requests): con el tope
+# en pool_size quedan las de overflow para el resto de endpoints
+DASHBOARD_PARALLEL_QUERIES = int(os.getenv("DASHBOARD_PARALLEL_QUERIES", str(DB_POOL_SIZE)))
+_bundle_slots = asyncio.Semaphore(DASHBOARD_PARALLEL_QUERIES)
 from app.models import Transaction  # no Movement
 
 
-@router.get("/")
-async def get_dashboard_data(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    today = datetime.utcnow()
-    start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+def _month_start():
+    return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
-    # Todas las transacciones del mes actual
-    result = await db.execute(
-        select(Transaction)
-        .where(Transaction.user_id == current_user.id)
-        .where(Transaction.date >= start)
-        .order_by(Transaction.date.desc())
-    )
-    transactions = result.scalars().all()
 
-    # Conteo total de transacciones del usuario (para saber si es nuevo)
-    total_result = await db.execute(
-        select(func.count(Transaction.id))
-        .where(Transaction.user_id == current_user.id)
+async def _totals(db: AsyncSession, user_id: int):
+    # Totales del mes, saldo y conteos en una sola consulta agregada
+    in_month = Transaction.date >= _month_start()
+    ingresos_col = func.coalesce(
+        func.sum(Transaction.amount).filter(in_month, Transaction.type == "income"), 0
     )
-    total_count = total_result.scalar()
+    egresos_col = func.coalesce(
+        func.sum(Transaction.amount).filter(in_month, Transaction.type == "expense"), 0
+    )
+    totals = await db.execute(
+        select(
+            ingresos_col.label("ingresos"),
+            egresos_col.label("egresos"),
+            (ingresos_col - egresos_col).label("saldo"),
+            func.count(Transaction.id).filter(in_month).label("month_count"),
+            # Conteo total de transacciones del usuario (para saber si es nuevo)
+            func.count(Transaction.id).label("total_count"),
+        )
+        .where(Transaction.user_id == user_id)
+    )
+    ingresos, egresos, saldo, month_count, total_count = totals.one()
+    return {
+        "ingresos": ingresos,
+        "egresos": egresos,
+        "saldo": saldo,
+        "month_transactions": month_count,
+        "total_transactions": total_count
+    }
 
-    ingresos = sum(t.amount for t in transactions if t.type == "income")
-    egresos = sum(t.amount for t in transactions if t.type == "expense")
-    saldo = ingresos - egresos
 
-    # Agrupado diario para timeline
+async def _timeline(db: AsyncSession, user_id: int, days: int):
+    # Timeline diario desde daily_rollups, acotado a la ventana pedida
+    timeline_start = datetime.utcnow().date() - timedelta(days=days - 1)
     res = await db.execute(
-        select(
-            func.date_trunc("day", Transaction.date).label("day"),
-            Transaction.type,
-            func.sum(Transaction.amount)
-        )
-        .where(Transaction.user_id == current_user.id)
-        .group_by("day", Transaction.type)
-        .order_by("day")
+        select(DailyRollup.day, DailyRollup.type, DailyRollup.total)
+        .where(DailyRollup.user_id == user_id)
+        .where(DailyRollup.day >= timeline_start)
+        .order_by(DailyRollup.day)
     )
     grouped = res.all()
 
@@ -63,100 +75,64 @@ async def get_dashboard_data(
         if d not in timeline:
             timeline[d] = {"income": 0, "expense": 0}
         timeline[d][tipo] = total
+    return timeline
 
-    # Serializa para frontend
-    serialized = [
-        {
-            "amount": t.amount,
-            "type": t.type,
-            "category": t.category_id,
-            "description": t.description,
-            "date": t.date.isoformat(),
-        }
-        for t in transactions
-    ]
 
-    return {
-        "ingresos": ingresos,
-        "egresos": egresos,
-        "saldo": saldo,
-        "timeline": timeline,
-        "transactions": serialized,
-        "total_transactions": total_count
-    }
-
-@router.get("/overview")
-async def get_monthly_overview(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    res = await db.execute(
+async def _month_transactions(db: AsyncSession, user_id: int):
+    result = await db.execute(
         select(
-            extract("month", Transaction.date).label("month"),
+            Transaction.amount,
             Transaction.type,
-            func.sum(Transaction.amount)
+            Transaction.category_id,
+            Transaction.description,
+            Transaction.date,
         )
-        .where(Transaction.user_id == current_user.id)
-        .group_by("month", Transaction.type)
-        .order_by("month")
+        .where(Transaction.user_id == user_id)
+        .where(Transaction.date >= _month_start())
+        .order_by(Transaction.date.desc())
     )
-    rows = res.all()
-
-    # Inicializa todos los meses con 0
-    data = {m: {"income": 0, "expense": 0} for m in range(1, 13)}
-
-    for month, tipo, total in rows:
-        data[int(month)][tipo] = total
-
-    result = [
+    # Serializa para frontend
+    return [
         {
-            "month": month,
-            "income": values["income"],
-            "expense": values["expense"]
+            "amount": amount,
+            "type": tipo,
+            "category": category_id,
+            "description": description,
+            "date": date.isoformat(),
         }
-        for month, values in data.items()
+        for amount, tipo, category_id, description, date in result.all()
     ]
 
-    return result
 
+async def _overview(db: AsyncSession, user_id: int, year: int | None, rolling: bool):
+    # Año calendario (por defecto el actual) o ventana móvil de 12 meses
+    this_year, this_month = current_month()
+    if rolling:
+        months = [add_months(this_year, this_month, n) for n in range(-11, 1)]
+    else:
+        months = [(year or this_year, m) for m in range(1, 13)]
 
-@router.get("/summary")
-async def get_balance_summary(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    
-    today = datetime.utcnow()
-    start_this_month = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    data = await monthly_overview(db, user_id, months)
 
-    start_last_month = (start_this_month.replace(day=1) - timedelta(days=1)).replace(day=1)
+    return [
+        {
+            "year": y,
+            "month": m,
+            "income": data[(y, m)]["income"],
+            "expense": data[(y, m)]["expense"]
+        }
+        for y, m in months
+    ]
 
-    start =  start_last_month
 
-    # Actual
-    result = await db.execute(
-        select(Transaction)
-        .options(selectinload(Transaction.category))  # carga categorías
-        .where(Transaction.user_id == current_user.id)
-        .where(Transaction.date >= start)
-        .order_by(Transaction.date.desc())
-)
-    current_transactions = result.scalars().all()
-    ingresos = sum(t.amount for t in current_transactions if t.type == "income")
-    egresos = sum(t.amount for t in current_transactions if t.type == "expense")
-    total_balance = ingresos - egresos
+async def _summary(db: AsyncSession, user_id: int):
+    # Dos lecturas por clave primaria en monthly_balances: este mes y el anterior
+    this_month = current_month()
+    last_month = add_months(*this_month, -1)
+    balances = await month_balances(db, user_id, [this_month, last_month])
 
-    # Mes pasado
-    result = await db.execute(
-        select(Transaction)
-        .where(Transaction.user_id == current_user.id)
-        .where(Transaction.date >= start_last_month)
-        .where(Transaction.date < start_this_month)
-    )
-    previous_transactions = result.scalars().all()
-    ingresos_prev = sum(t.amount for t in previous_transactions if t.type == "income")
-    egresos_prev = sum(t.amount for t in previous_transactions if t.type == "expense")
-    prev_balance = ingresos_prev - egresos_prev
+    total_balance = balances[this_month]["income"] - balances[this_month]["expense"]
+    prev_balance = balances[last_month]["income"] - balances[last_month]["expense"]
 
     # Cambio porcentual
     if prev_balance == 0:
@@ -168,3 +144,106 @@ async def get_balance_summary(
         "total_balance": total_balance,
         "balance_change": balance_change
     }
+
+
+@router.get("/")
+async def get_dashboard_data(
+    request: Request,
+    include_transactions: bool = False,
+    timeline_days: int = Query(90, ge=1, le=366),
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    async def compute():
+        response = await _totals(db, current_user.id)
+        response["timeline"] = await _timeline(db, current_user.id, timeline_days)
+
+        # Las filas solo se cargan si el cliente las pide
+        if include_transactions:
+            response["transactions"] = await _month_transactions(db, current_user.id)
+        return response
+
+    version = await get_data_version(db, current_user.id)
+    return await versioned_response(request, current_user.id, version, compute)
+
+
+@router.get("/bundle")
+async def get_dashboard_bundle(
+    request: Request,
+    include_transactions: bool = False,
+    timeline_days: int = Query(90, ge=1, le=366),
+    year: int | None = Query(None, ge=1970, le=9999),
+    rolling: bool = False,
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    user_id = current_user.id
+    # Mismo destino (réplica o primario) que la sesión con la que se leyó la versión
+    factory = read_sessionmaker(request)
+
+    async def part(fn, *args):
+        # Cada consulta toma su conexión solo mientras tiene turno
+        async with _bundle_slots:
+            return await run_in_session(fn, user_id, *args, session_factory=factory)
+
+    async def compute():
+        # Todos los widgets en una respuesta: una sola autenticación y cada consulta
+        # en su propia sesión del pool, en paralelo
+        parts = [
+            part(_totals),
+            part(_timeline, timeline_days),
+            part(_overview, year, rolling),
+            part(_summary),
+        ]
+        if include_transactions:
+            parts.append(part(_month_transactions))
+
+        totals, timeline, overview, summary, *rows = await asyncio.gather(*parts)
+
+        response = {
+            "totals": totals,
+            "timeline": timeline,
+            "overview": overview,
+            "summary": summary,
+        }
+        if rows:
+            response["transactions"] = rows[0]
+        return response
+
+    version = await get_data_version(db, user_id)
+    # Devuelve la conexión antes de abrir las del fan-out: si no, cada bundle retiene una
+    # mientras espera otras 4-5 y unos pocos bundles concurrentes agotan el pool
+    await db.close()
+    return await versioned_response(request, user_id, version, compute)
+
+
+@router.get("/overview")
+async def get_monthly_overview(
+    request: Request,
+    year: int | None = Query(None, ge=1970, le=9999),
+    rolling: bool = False,
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    version = await get_data_version(db, current_user.id)
+    return await versioned_response(
+        request,
+        current_user.id,
+        version,
+        lambda: _overview(db, current_user.id, year, rolling),
+    )
+
+
+@router.get("/summary")
+async def get_balance_summary(
+    request: Request,
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    version = await get_data_version(db, current_user.id)
+    return await versioned_response(
+        request,
+        current_user.id,
+        version,
+        lambda: _summary(db, current_user.id),
+    )
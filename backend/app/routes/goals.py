@@ -19,6 +19,6 @@ async def create_goal(goal: schemas.GoalCreate, db: AsyncSession = Depends(datab
     return new_goal
 
 @router.get("/", response_model=list[schemas.GoalOut])
-async def list_goals(db: AsyncSession = Depends(database.get_db)):
+async def list_goals(db: AsyncSession = Depends(database.get_read_db)):
     result = await db.execute(select(models.Goal))
     return result.scalars().all()
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.warmup import readiness
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get("/healthz")
+async def healthz():
+    # Liveness: el proceso responde; no toca la base para no reiniciar workers si ella cae
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    # Readiness: solo tras calentar el pool, y deja de estarlo al iniciar el apagado
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content={"status": "warming", **readiness.stats()})
+    return {"status": "ready", **readiness.stats()}
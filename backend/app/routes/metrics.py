@@ -0,0 +1,59 @@
+import os
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.auth import hashing
+from app.auth.revocation import revocation_list
+from app.auth.throttle import login_throttle
+from app.auth_module import principal_cache
+from app.database import pool_metrics
+from app.http_cache import response_cache
+
+# Token que deben presentar los scrapers (Authorization: Bearer ...); sin él, /metrics no responde
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+async def require_metrics_token(authorization: str | None = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    if (
+        not METRICS_TOKEN
+        or scheme.lower() != "bearer"
+        or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode())
+    ):
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+
+router = APIRouter(
+    prefix="/metrics", tags=["Metrics"], dependencies=[Depends(require_metrics_token)]
+)
+
+
+@router.get("/auth-cache")
+async def auth_cache_metrics():
+    # Cada worker tiene sus propios caches: el pid permite distinguirlos
+    return {
+        "pid": os.getpid(),
+        "principal_cache": principal_cache.stats(),
+        "response_cache": response_cache.stats(),
+    }
+
+
+@router.get("/hashing")
+async def hashing_metrics():
+    return {"pid": os.getpid(), **hashing.stats()}
+
+
+@router.get("/login-throttle")
+async def login_throttle_metrics():
+    return {"pid": os.getpid(), **login_throttle.stats()}
+
+
+@router.get("/revocation")
+async def revocation_metrics():
+    return {"pid": os.getpid(), **revocation_list.stats()}
+
+
+@router.get("/pool")
+async def pool_stats():
+    return {"pid": os.getpid(), "pools": [m.snapshot() for m in pool_metrics.values()]}
@@ -1,18 +1,147 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+from dataclasses import dataclass
+from typing import Any
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
-from datetime import date
+from sqlalchemy.orm import joinedload
+from pydantic import BaseModel, ValidationError
+from datetime import date, datetime
 
-from app.database import get_db
-from app.models import Transaction, User
-from app.schemas import TransactionCreate, TransactionRead
+from app.database import get_db, get_read_db, read_sessionmaker
+from app.models import Category, Transaction, User
+from app.pagination import decode_cursor, encode_cursor, naive_utc
+from app.schemas import BulkTransactionResult, ImportResult, TransactionCreate, TransactionPage, TransactionRead
 
-from app.auth_module import get_current_user
+from app.auth_module import Principal, get_principal
+from app.data_version import bump_data_version
+from app.dedup import find_duplicates, get_idempotency_key, idempotent, transaction_fingerprint
+from app.exports import EXPORT_FORMATS, stream_rows
+from app.imports import import_statement
+from app.rollups import record_rows, record_transactions
+
+# Filas por request en /transactions/bulk
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "5000"))
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 from app.models import Transaction  # no Movement
 
 
+@dataclass(frozen=True)
+class TransactionFilters:
+    type: str | None = None
+    category_ids: list[int] | None = None
+    date_from: datetime | None = None
+    date_to: datetime | None = None
+    min_amount: float | None = None
+    max_amount: float | None = None
+    tags: list[str] | None = None
+
+
+def transaction_filters(
+    type: str | None = None,
+    category_id: list[int] | None = Query(None),
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    min_amount: float | None = None,
+    max_amount: float | None = None,
+    tags: list[str] | None = Query(None),
+) -> TransactionFilters:
+    # Filtros compartidos por el listado y la exportación
+    if type is not None and type not in ("income", "expense"):
+        raise HTTPException(status_code=400, detail="Invalid type")
+    # date es TIMESTAMP sin zona: una fecha con zona se compara como UTC
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(status_code=400, detail="date_from debe ser anterior a date_to")
+    return TransactionFilters(
+        type=type,
+        category_ids=category_id,
+        date_from=date_from,
+        date_to=date_to,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        tags=tags,
+    )
+
+
+def filtered_transactions(user_id: int, filters: TransactionFilters):
+    # user_id + rango de date van por ix_transactions_user_date; lo demás filtra sobre esas filas
+    query = select(Transaction).where(Transaction.user_id == user_id)
+    if filters.type:
+        query = query.where(Transaction.type == filters.type)
+    if filters.category_ids:
+        query = query.where(Transaction.category_id.in_(filters.category_ids))
+    if filters.date_from:
+        query = query.where(Transaction.date >= filters.date_from)
+    if filters.date_to:
+        query = query.where(Transaction.date < filters.date_to)
+    if filters.min_amount is not None:
+        query = query.where(Transaction.amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        query = query.where(Transaction.amount <= filters.max_amount)
+    if filters.tags:
+        # Debe tener todas las etiquetas pedidas
+        query = query.where(Transaction.tags.contains(filters.tags))
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+@router.get("/", response_model=TransactionPage)
+async def list_transactions(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    filters: TransactionFilters = Depends(transaction_filters),
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Keyset sobre (date, id): el costo depende del tamaño de página, no del historial
+    query = filtered_transactions(current_user.id, filters).options(joinedload(Transaction.category))
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.where(tuple_(Transaction.date, Transaction.id) < tuple_(after_date, after_id))
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson|pdf)$"),
+    filters: TransactionFilters = Depends(transaction_filters),
+    current_user: Principal = Depends(get_principal),
+    session_factory=Depends(read_sessionmaker)
+):
+    # Mismos filtros que el listado, sin paginar: se lee con un cursor del servidor y se
+    # envía por pedazos, así la memoria no depende de cuántas filas tenga el usuario
+    query = (
+        filtered_transactions(current_user.id, filters)
+        .with_only_columns(
+            Transaction.date,
+            Transaction.description,
+            Category.name.label("category"),
+            Transaction.type,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.tags,
+        )
+        .outerjoin(Category, Transaction.category_id == Category.id)
+    )
+    media_type, chunks = EXPORT_FORMATS[format]
+    filename = f"transactions-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        chunks(stream_rows(session_factory, query)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
 # @router.post("/")
 # async def create_transaction(
@@ -46,26 +175,163 @@ from app.models import Transaction  # no Movement
 @router.post("/")
 async def create_transaction(
     data: TransactionCreate,
-    current_user: User = Depends(get_current_user),
+    idempotency_key=Depends(get_idempotency_key),
+    current_user: Principal = Depends(get_principal),
     db: AsyncSession = Depends(get_db)
 ):
     if data.type not in ("income", "expense"):
         raise HTTPException(status_code=400, detail="Invalid type")
 
-    transaction = Transaction(
-        description=data.description,
-        amount=data.amount,
-        type=data.type,
-        date=data.date,
-        user_id=current_user.id,
-        category_id=data.category_id  # 👈 se guarda el id de la categoría
-    )
+    async def create():
+        moment = naive_utc(data.date)
+        fingerprint = transaction_fingerprint(
+            current_user.id, moment, data.amount, data.type, data.description
+        )
+        # Solo aviso: dos cafés iguales el mismo día son legítimos; los reintentos los
+        # cubre Idempotency-Key
+        duplicates = await find_duplicates(db, current_user.id, [fingerprint])
 
-    db.add(transaction)
-    await db.commit()
-    await db.refresh(transaction)
+        transaction = Transaction(
+            description=data.description,
+            amount=data.amount,
+            type=data.type,
+            date=moment,
+            user_id=current_user.id,
+            category_id=data.category_id,  # 👈 se guarda el id de la categoría
+            fingerprint=fingerprint,
+        )
+
+        db.add(transaction)
+        # El rollup diario se actualiza en la misma transacción que el insert
+        await record_transactions(db, [transaction])
+        await db.commit()
+        await db.refresh(transaction)
+
+        return {
+            "id": transaction.id,
+            "message": "Transaction created successfully",
+            "possible_duplicate_of": duplicates.get(fingerprint),
+        }
 
+    return await idempotent(idempotency_key, data, create)
+
+
+def transaction_row(user_id: int, data: TransactionCreate) -> dict:
+    # Fila para el insert por lotes; date en UTC sin zona (la columna es TIMESTAMP) antes de
+    # calcular la huella y el día del rollup
+    moment = naive_utc(data.date)
     return {
-        "id": transaction.id,
-        "message": "Transaction created successfully"
+        "description": data.description,
+        "amount": data.amount,
+        "type": data.type,
+        "date": moment,
+        "user_id": user_id,
+        "category_id": data.category_id,
+        "fingerprint": transaction_fingerprint(
+            user_id, moment, data.amount, data.type, data.description
+        ),
     }
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+@router.post("/bulk", response_model=BulkTransactionResult)
+async def create_transactions_bulk(
+    items: list[Any] = Body(...),
+    allow_duplicates: bool = False,
+    idempotency_key=Depends(get_idempotency_key),
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Máximo {BULK_MAX_ITEMS} transacciones por lote"
+        )
+
+    async def create():
+        # Una sola pasada de validación; una fila inválida no descarta el resto del lote
+        errors = []
+        valid = []
+        for index, raw in enumerate(items):
+            try:
+                data = TransactionCreate.model_validate(raw)
+            except ValidationError as e:
+                errors.append({"index": index, "detail": _validation_detail(e)})
+                continue
+            if data.type not in ("income", "expense"):
+                errors.append({"index": index, "detail": "Invalid type"})
+                continue
+            valid.append((index, data))
+
+        # Todas las categorías del lote con una consulta
+        category_ids = {data.category_id for _, data in valid}
+        known = set()
+        if category_ids:
+            result = await db.execute(select(Category.id).where(Category.id.in_(category_ids)))
+            known = set(result.scalars())
+
+        indexes = []
+        rows = []
+        for index, data in valid:
+            if data.category_id not in known:
+                errors.append({"index": index, "detail": f"Category {data.category_id} not found"})
+                continue
+            indexes.append(index)
+            rows.append(transaction_row(current_user.id, data))
+
+        if not allow_duplicates:
+            # Se omiten las que ya existen (lote reenviado o solapado); repetidas dentro del
+            # mismo lote sí se guardan, como en un extracto real
+            existing = await find_duplicates(db, current_user.id, (r["fingerprint"] for r in rows))
+            kept_indexes, kept_rows = [], []
+            for index, row in zip(indexes, rows):
+                duplicate_of = existing.get(row["fingerprint"])
+                if duplicate_of is None:
+                    kept_indexes.append(index)
+                    kept_rows.append(row)
+                else:
+                    errors.append({"index": index, "detail": f"Duplicada de la transacción {duplicate_of}"})
+            indexes, rows = kept_indexes, kept_rows
+        errors.sort(key=lambda e: e["index"])
+
+        created = []
+        if rows:
+            # INSERT multi-fila ... RETURNING id (SQLAlchemy lo parte en lotes); ids en el orden de rows
+            result = await db.execute(
+                insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), rows
+            )
+            ids = result.scalars().all()
+            # Rollups y data_version una vez por lote, en la misma transacción
+            await record_rows(db, rows)
+            await bump_data_version(db, current_user.id)
+            await db.commit()
+            created = [{"index": index, "id": new_id} for index, new_id in zip(indexes, ids)]
+
+        return {"created": created, "errors": errors}
+
+    return await idempotent(idempotency_key, items, create)
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_transactions(
+    request: Request,
+    format: str | None = Query(None, pattern="^(csv|ofx)$"),
+    default_category_id: int | None = None,
+    allow_duplicates: bool = False,
+    current_user: Principal = Depends(get_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    # El extracto llega como cuerpo crudo (no multipart) y se lee por pedazos a medida que llega
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "ofx" if "ofx" in content_type else "csv"
+
+    result = await import_statement(
+        db, current_user.id, request.stream(), format, default_category_id, allow_duplicates
+    )
+    await db.commit()
+    return result
@@ -57,6 +57,29 @@ class TransactionRead(BaseModel):
     class Config:
         orm_mode = True
 
+class BulkRowCreated(BaseModel):
+    index: int
+    id: int
+
+class BulkRowError(BaseModel):
+    index: int
+    detail: str
+
+class BulkTransactionResult(BaseModel):
+    created: list[BulkRowCreated]
+    errors: list[BulkRowError]
+
+class ImportResult(BaseModel):
+    imported: int
+    duplicates: int
+    without_category: int
+    error_count: int
+    errors: list[BulkRowError]
+
+class TransactionPage(BaseModel):
+    items: list[TransactionRead]
+    next_cursor: Optional[str]
+
 # ================= GOALS =================
 
 class GoalBase(BaseModel):
@@ -128,3 +151,7 @@ class TransactionLogOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+class TransactionLogPage(BaseModel):
+    items: list[TransactionLogOut]
+    next_cursor: Optional[str]
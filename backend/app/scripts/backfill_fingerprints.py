@@ -0,0 +1,79 @@
+# Calcula transactions.fingerprint para las filas que aún no la tienen, por lotes de id.
+# Uso: python -m app.scripts.backfill_fingerprints [--batch-size 5000]
+import argparse
+import asyncio
+
+from sqlalchemy import func, select, text
+
+from app.database import async_session, engine
+from app.dedup import transaction_fingerprint
+from app.models import Transaction
+
+
+async def backfill(batch_size: int):
+    total = 0
+    skipped = 0
+    last_id = 0
+    while True:
+        # Un commit por lote: no bloquea la tabla ni deja una transacción larga abierta
+        async with async_session() as db:
+            result = await db.execute(
+                select(
+                    Transaction.id,
+                    Transaction.user_id,
+                    # date es nullable: las filas viejas sin fecha usan created_at para la huella
+                    func.coalesce(Transaction.date, Transaction.created_at).label("date"),
+                    Transaction.amount,
+                    Transaction.type,
+                    Transaction.description,
+                )
+                .where(Transaction.fingerprint.is_(None))
+                .where(Transaction.id > last_id)
+                .order_by(Transaction.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            # Sin date ni created_at no hay huella posible: quedan en NULL y se informan al final
+            dated = [r for r in rows if r.date is not None]
+            skipped += len(rows) - len(dated)
+            if not dated:
+                continue
+            await db.execute(
+                text(
+                    """
+                    UPDATE transactions AS t
+                    SET fingerprint = v.fingerprint
+                    FROM unnest(CAST(:ids AS INT[]), CAST(:fingerprints AS TEXT[]))
+                        AS v(id, fingerprint)
+                    WHERE t.id = v.id
+                    """
+                ),
+                {
+                    "ids": [r.id for r in dated],
+                    "fingerprints": [
+                        transaction_fingerprint(r.user_id, r.date, r.amount, r.type, r.description)
+                        for r in dated
+                    ],
+                },
+            )
+            await db.commit()
+        total += len(dated)
+        print(f"  {total} filas")
+    await engine.dispose()
+    print(f"fingerprint: {total} filas actualizadas")
+    if skipped:
+        print(f"fingerprint: {skipped} filas sin fecha omitidas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Completa transactions.fingerprint")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
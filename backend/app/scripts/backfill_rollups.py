@@ -0,0 +1,26 @@
+# Construye daily_rollups a partir del historial existente de transactions.
+# Uso: python -m app.scripts.backfill_rollups [--user-id N]
+import argparse
+import asyncio
+
+from app.database import async_session, engine
+from app.rollups import rebuild_rollups
+
+
+async def backfill(user_id: int | None = None):
+    async with async_session() as db:
+        rows = await rebuild_rollups(db, user_id)
+        await db.commit()
+    await engine.dispose()
+    print(f"daily_rollups: {rows} filas generadas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla daily_rollups")
+    parser.add_argument("--user-id", type=int, default=None, help="solo este usuario")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Compara el throughput de las consultas del dashboard conectando directo a Postgres y a
+# través de PgBouncer (pool_mode=transaction, con DB_PGBOUNCER activado en ese engine).
+# Uso: python -m app.scripts.bench_pool --pgbouncer-url postgresql+asyncpg://...:6432/finflow
+#          [--direct-url ...] [--concurrency 50] [--duration 15] [--workload dashboard]
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.data_version import get_data_version
+from app.database import DB_URL, build_engine
+from app.routes.dashboard import _timeline, _totals
+
+
+async def simple(db, user_id: int):
+    await db.execute(text("SELECT 1"))
+
+
+async def dashboard(db, user_id: int):
+    # Lo que cuesta un GET /dashboard sin caché: versión, totales y timeline
+    await get_data_version(db, user_id)
+    await _totals(db, user_id)
+    await _timeline(db, user_id, 90)
+
+
+WORKLOADS = {"simple": simple, "dashboard": dashboard}
+
+
+async def run(name: str, url: str, pgbouncer: bool, args) -> dict:
+    # Un engine por objetivo, con tantas conexiones como clientes concurrentes
+    engine = build_engine(
+        url, f"bench_{name}", pgbouncer=pgbouncer, pool_size=args.concurrency, max_overflow=0
+    )
+    session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    workload = WORKLOADS[args.workload]
+    latencies = []
+    errors = 0
+
+    async def client(deadline: float, record: bool):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session() as db:
+                    await workload(db, args.user_id)
+            except Exception:
+                errors += 1
+                continue
+            if record:
+                latencies.append(time.perf_counter() - started)
+
+    # Calentamiento sin medir: abre las conexiones y prepara las sentencias
+    deadline = time.perf_counter() + args.warmup
+    await asyncio.gather(*(client(deadline, False) for _ in range(args.concurrency)))
+    errors = 0
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(deadline, True) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+async def main_async(args):
+    results = [await run("directo", args.direct_url, False, args)]
+    if args.pgbouncer_url:
+        results.append(await run("pgbouncer", args.pgbouncer_url, True, args))
+
+    print(
+        f"\nworkload={args.workload} concurrencia={args.concurrency} "
+        f"duración={args.duration:.0f}s usuario={args.user_id}"
+    )
+    print(f"{'objetivo':<10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8}")
+    for r in results:
+        print(
+            f"{r['name']:<10} {r['rps']:9.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} "
+            f"{r['p99_ms']:8.2f} {r['errors']:8d}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: conexión directa vs PgBouncer")
+    parser.add_argument("--direct-url", default=DB_URL)
+    parser.add_argument("--pgbouncer-url", default=None, help="URL asyncpg hacia PgBouncer")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="dashboard")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0, help="segundos medidos por objetivo")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
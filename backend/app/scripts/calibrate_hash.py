@@ -0,0 +1,93 @@
+# Mide bcrypt (y argon2 si argon2-cffi está instalado) en esta máquina y sugiere los
+# parámetros más costosos que se mantienen bajo la latencia objetivo por hash.
+# Uso: python -m app.scripts.calibrate_hash [--target-ms 250] [--argon2]
+import argparse
+import statistics
+import time
+
+from app.auth.utils import build_crypt_context
+
+SAMPLE_PASSWORD = "calibracion-Finflow-2024!"
+
+
+def measure(context, samples: int) -> float:
+    # Mediana en ms de hash + verify, que es lo que cuesta un registro o un login
+    context.hash(SAMPLE_PASSWORD)  # calentamiento: la primera llamada carga el backend
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.verify(SAMPLE_PASSWORD, context.hash(SAMPLE_PASSWORD))
+        timings.append((time.perf_counter() - started) * 1000 / 2)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms: float, samples: int):
+    best = None
+    for rounds in range(4, 32):
+        ms = measure(build_crypt_context(["bcrypt"], bcrypt_rounds=rounds), samples)
+        print(f"  bcrypt rounds={rounds:<2} {ms:8.1f} ms")
+        if ms > target_ms:
+            break
+        best = (rounds, ms)
+    return best
+
+
+def calibrate_argon2(target_ms: float, samples: int, memory_kib: int, parallelism: int):
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        print("  argon2-cffi no está instalado, se omite")
+        return None
+
+    best = None
+    for time_cost in range(1, 20):
+        context = build_crypt_context(
+            ["argon2"],
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_kib,
+            argon2_parallelism=parallelism,
+        )
+        ms = measure(context, samples)
+        print(f"  argon2 t={time_cost:<2} m={memory_kib}KiB p={parallelism} {ms:8.1f} ms")
+        if ms > target_ms:
+            break
+        best = (time_cost, ms)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra el costo del hash de contraseñas")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latencia objetivo por hash")
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--argon2", action="store_true", help="también mide argon2")
+    parser.add_argument("--argon2-memory-kib", type=int, default=65536)
+    parser.add_argument("--argon2-parallelism", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"objetivo: {args.target_ms:.0f} ms por hash")
+    env = {}
+
+    bcrypt_best = calibrate_bcrypt(args.target_ms, args.samples)
+    if bcrypt_best is None:
+        print("ni el costo mínimo de bcrypt entra en el objetivo")
+    else:
+        env["BCRYPT_ROUNDS"] = bcrypt_best[0]
+
+    if args.argon2:
+        argon2_best = calibrate_argon2(
+            args.target_ms, args.samples, args.argon2_memory_kib, args.argon2_parallelism
+        )
+        if argon2_best is not None:
+            env["PASSWORD_SCHEMES"] = "argon2,bcrypt"
+            env["ARGON2_TIME_COST"] = argon2_best[0]
+            env["ARGON2_MEMORY_COST"] = args.argon2_memory_kib
+            env["ARGON2_PARALLELISM"] = args.argon2_parallelism
+
+    if env:
+        print("\n# Agrega al .env; los hashes existentes se actualizan en el siguiente login")
+        for key, value in env.items():
+            print(f"{key}={value}")
+
+
+if __name__ == "__main__":
+    main()
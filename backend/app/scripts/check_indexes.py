@@ -0,0 +1,128 @@
+# Corre EXPLAIN ANALYZE sobre las consultas calientes y falla (exit 1) si alguna dejó de
+# usar su índice. Con pocos datos el planner prefiere seq scan: usa --no-seqscan en desarrollo.
+# Uso: python -m app.scripts.check_indexes [--user-id N] [--no-seqscan] [--verbose]
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import text
+
+from app.database import engine
+
+# (nombre, SQL equivalente al de la ruta, índice que debe aparecer en el plan)
+HOT_QUERIES = [
+    (
+        "dashboard totales",
+        """
+        SELECT COALESCE(SUM(amount) FILTER (WHERE date >= :month_start AND type = 'income'), 0),
+               COALESCE(SUM(amount) FILTER (WHERE date >= :month_start AND type = 'expense'), 0),
+               COUNT(*) FILTER (WHERE date >= :month_start),
+               COUNT(*)
+        FROM transactions
+        WHERE user_id = :user_id
+        """,
+        "ix_transactions_user_date_covering",
+    ),
+    (
+        "dashboard transacciones del mes",
+        """
+        SELECT amount, type, category_id, description, date
+        FROM transactions
+        WHERE user_id = :user_id AND date >= :month_start
+        ORDER BY date DESC
+        """,
+        "ix_transactions_user_date",
+    ),
+    (
+        "presupuestos del mes",
+        """
+        SELECT * FROM budgets
+        WHERE user_id = :user_id AND year = :year AND month = :month
+        """,
+        "ix_budgets_user_period",
+    ),
+    (
+        "metas del usuario",
+        "SELECT * FROM goals WHERE user_id = :user_id",
+        "ix_goals_user",
+    ),
+    (
+        "auditoría por rango",
+        """
+        SELECT * FROM transactions_log
+        WHERE user_id = :user_id AND created_at >= :month_start AND created_at < now()
+        ORDER BY created_at DESC, id DESC
+        LIMIT 51
+        """,
+        "ix_transactions_log_created_brin",
+    ),
+    (
+        "auditoría de una transacción",
+        """
+        SELECT * FROM transactions_log
+        WHERE transaction_id = (SELECT MAX(transaction_id) FROM transactions_log)
+        ORDER BY created_at DESC
+        """,
+        "ix_transactions_log_tx_created",
+    ),
+]
+
+
+def plan_indexes(node) -> set[str]:
+    found = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        found |= plan_indexes(child)
+    return found
+
+
+async def check(user_id: int | None, no_seqscan: bool, verbose: bool) -> bool:
+    ok = True
+    async with engine.connect() as conn:
+        if no_seqscan:
+            await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        if user_id is None:
+            # El usuario con más transacciones es el caso que más castiga un mal plan
+            user_id = (await conn.execute(text(
+                "SELECT user_id FROM transactions GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1"
+            ))).scalar() or 1
+        month_start = (await conn.execute(text("SELECT date_trunc('month', now())::timestamp"))).scalar()
+
+        for name, sql, index in HOT_QUERIES:
+            result = await conn.execute(
+                text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"),
+                {
+                    "user_id": user_id,
+                    "month_start": month_start,
+                    "year": month_start.year,
+                    "month": month_start.month,
+                },
+            )
+            raw = result.scalar()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+            used = plan_indexes(plan["Plan"])
+            status = "ok   " if index in used else "FALLA"
+            ok = ok and index in used
+            print(
+                f"{status} {name:<34} {plan['Execution Time']:8.2f} ms  "
+                f"esperado={index} usados={sorted(used) or '-'}"
+            )
+            if verbose:
+                print(json.dumps(plan["Plan"], indent=2, ensure_ascii=False))
+        await conn.rollback()
+    await engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica que las consultas calientes usen sus índices")
+    parser.add_argument("--user-id", type=int, default=None, help="por defecto, el de más transacciones")
+    parser.add_argument("--no-seqscan", action="store_true", help="desactiva seq scan (tablas pequeñas)")
+    parser.add_argument("--verbose", action="store_true", help="imprime el plan completo")
+    args = parser.parse_args()
+    if not asyncio.run(check(args.user_id, args.no_seqscan, args.verbose)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Aplica en orden los .sql de app/db/migrations que aún no se han aplicado.
+# Cada archivo corre en una transacción, salvo los que empiezan con "-- migrate: no-transaction"
+# (p. ej. CREATE INDEX CONCURRENTLY), que se ejecutan sentencia por sentencia.
+# Uso: python -m app.scripts.migrate [--list]
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.database import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "db" / "migrations"
+NO_TRANSACTION_MARKER = "-- migrate: no-transaction"
+
+
+def pending_files(applied: set[str]):
+    return [p for p in sorted(MIGRATIONS_DIR.glob("*.sql")) if p.stem not in applied]
+
+
+def split_statements(sql: str):
+    # Suficiente para estos archivos: sin ";" dentro de literales ni cuerpos de función
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+async def migrate(list_only: bool = False):
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection
+        await pg.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+            )
+            """
+        )
+        applied = {r["version"] for r in await pg.fetch("SELECT version FROM schema_migrations")}
+        pending = pending_files(applied)
+
+        for path in pending:
+            if list_only:
+                print(f"pendiente: {path.name}")
+                continue
+            print(f"aplicando {path.name} ...")
+            sql = path.read_text(encoding="utf-8")
+            if sql.startswith(NO_TRANSACTION_MARKER):
+                # Cada sentencia por separado: deben ser idempotentes (IF NOT EXISTS) por si
+                # la migración se corta a la mitad y hay que repetirla
+                for statement in split_statements(sql):
+                    await pg.execute(statement)
+                await pg.execute("INSERT INTO schema_migrations (version) VALUES ($1)", path.stem)
+                continue
+            async with pg.transaction():
+                await pg.execute(sql)
+                await pg.execute("INSERT INTO schema_migrations (version) VALUES ($1)", path.stem)
+
+        if not pending:
+            print("sin migraciones pendientes")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aplica las migraciones SQL pendientes")
+    parser.add_argument("--list", action="store_true", help="solo muestra las pendientes")
+    args = parser.parse_args()
+    asyncio.run(migrate(list_only=args.list))
+
+
+if __name__ == "__main__":
+    main()
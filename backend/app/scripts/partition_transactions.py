@@ -0,0 +1,162 @@
+# Convierte transactions en una tabla particionada por mes (RANGE sobre date) y copia las filas.
+# Opcional: solo vale la pena con muchos datos. Corre en una sola transacción con la tabla
+# bloqueada (si algo falla no cambia nada); en tablas grandes, en una ventana de mantenimiento.
+# Requiere las migraciones al día (python -m app.scripts.migrate).
+# Uso: python -m app.scripts.partition_transactions [--months-ahead 3]
+#      python -m app.scripts.partition_transactions --ensure   # solo crea particiones futuras
+import argparse
+import asyncio
+
+from app.database import engine
+from app.partitions import PARTITION_MONTHS_AHEAD, ensure_partitions, partition_ddl
+from app.rollups import add_months, current_month
+
+COLUMNS = (
+    "id, user_id, amount, type, category_id, description, date, "
+    "currency, tags, status, created_at, fingerprint"
+)
+
+POLICIES = """
+ALTER TABLE transactions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY select_own ON transactions
+  FOR SELECT
+  USING (user_id = current_setting('request.user_id')::INT);
+
+CREATE POLICY insert_own ON transactions
+  FOR INSERT
+  WITH CHECK (user_id = current_setting('request.user_id')::INT);
+
+CREATE POLICY update_own ON transactions
+  FOR UPDATE
+  USING (user_id = current_setting('request.user_id')::INT);
+
+CREATE POLICY delete_own ON transactions
+  FOR DELETE
+  USING (user_id = current_setting('request.user_id')::INT);
+"""
+
+AUDIT_TRIGGER = """
+CREATE TRIGGER trigger_log_transaction
+AFTER INSERT OR UPDATE OR DELETE ON transactions
+FOR EACH ROW EXECUTE FUNCTION log_transaction_changes();
+"""
+
+# Se crean en la tabla padre y Postgres los replica en cada partición
+INDEXES = """
+CREATE INDEX ix_transactions_user_date ON transactions(user_id, date, id);
+CREATE INDEX ix_transactions_user_date_covering ON transactions(user_id, date) INCLUDE (type, amount);
+CREATE INDEX idx_transactions_date ON transactions(date);
+CREATE INDEX idx_transactions_category ON transactions(category_id);
+CREATE INDEX ix_transactions_fingerprint ON transactions(fingerprint);
+"""
+
+
+async def convert(months_ahead: int):
+    try:
+        await _convert(months_ahead)
+    finally:
+        await engine.dispose()
+
+
+async def _convert(months_ahead: int):
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        pg = raw.driver_connection
+        async with pg.transaction():
+            await pg.execute("LOCK TABLE transactions IN ACCESS EXCLUSIVE MODE")
+            already = await pg.fetchval(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = 'transactions'::regclass)"
+            )
+            if already:
+                print("transactions ya está particionada")
+                return
+
+            sequence = await pg.fetchval("SELECT pg_get_serial_sequence('transactions', 'id')")
+            rows, first = await pg.fetchrow(
+                "SELECT COUNT(*), MIN(COALESCE(date, created_at, LOCALTIMESTAMP)) FROM transactions"
+            )
+
+            # La clave de partición tiene que estar en la PK, y date deja de aceptar NULL
+            await pg.execute(f"""
+                CREATE TABLE transactions_partitioned (
+                    id INT NOT NULL DEFAULT nextval('{sequence}'),
+                    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    amount DOUBLE PRECISION NOT NULL,
+                    type VARCHAR(50) NOT NULL,
+                    category_id INT REFERENCES categories(id),
+                    description TEXT,
+                    date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    currency CHAR(3) DEFAULT 'COP',
+                    tags TEXT[],
+                    status VARCHAR(20) DEFAULT 'completed',
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    fingerprint VARCHAR(64),
+                    PRIMARY KEY (id, date)
+                ) PARTITION BY RANGE (date)
+            """)
+
+            this_month = current_month()
+            ym = (first.year, first.month) if first else this_month
+            last = add_months(*this_month, months_ahead)
+            partitions = 0
+            while ym <= last:
+                await pg.execute(partition_ddl(*ym, parent="transactions_partitioned"))
+                partitions += 1
+                ym = add_months(*ym, 1)
+            # Fechas fuera de rango (muy a futuro) caen aquí en vez de fallar el insert
+            await pg.execute(
+                "CREATE TABLE transactions_default PARTITION OF transactions_partitioned DEFAULT"
+            )
+
+            await pg.execute(f"""
+                INSERT INTO transactions_partitioned ({COLUMNS})
+                SELECT id, user_id, amount, type, category_id, description,
+                       COALESCE(date, created_at, LOCALTIMESTAMP), currency, tags, status, created_at,
+                       fingerprint
+                FROM transactions
+            """)
+
+            # La secuencia pasa a la tabla nueva antes de borrar la vieja. transactions_log
+            # pierde su FK: no puede apuntar a id solo, que ya no es único por sí mismo
+            await pg.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions_partitioned.id")
+            await pg.execute("DROP TABLE transactions CASCADE")
+            await pg.execute("ALTER TABLE transactions_partitioned RENAME TO transactions")
+            for old, new in (
+                ("transactions_partitioned_pkey", "transactions_pkey"),
+                ("transactions_partitioned_user_id_fkey", "transactions_user_id_fkey"),
+                ("transactions_partitioned_category_id_fkey", "transactions_category_id_fkey"),
+            ):
+                await pg.execute(f"ALTER TABLE transactions RENAME CONSTRAINT {old} TO {new}")
+
+            await pg.execute(INDEXES)
+            await pg.execute(POLICIES)
+            if await pg.fetchval("SELECT to_regproc('log_transaction_changes') IS NOT NULL"):
+                await pg.execute(AUDIT_TRIGGER)
+            copied = await pg.fetchval("SELECT COUNT(*) FROM transactions")
+            if copied != rows:
+                raise RuntimeError(f"se copiaron {copied} de {rows} filas, se revierte")
+
+        await pg.execute("ANALYZE transactions")
+        print(f"transactions particionada: {rows} filas en {partitions} particiones mensuales + default")
+
+
+async def ensure(months_ahead: int):
+    created = await ensure_partitions(months_ahead)
+    await engine.dispose()
+    print(f"particiones creadas: {', '.join(created) or 'ninguna'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particiona transactions por mes")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD,
+                        help="meses futuros con partición ya creada")
+    parser.add_argument("--ensure", action="store_true",
+                        help="no convierte; solo crea las particiones futuras que falten")
+    args = parser.parse_args()
+    asyncio.run(ensure(args.months_ahead) if args.ensure else convert(args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from sqlalchemy import event
+
+# SQL apagado por defecto; en su lugar: log de consultas lentas + muestreo opcional
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Fracción de consultas (0..1) que se registran completas aunque no sean lentas
+SQL_LOG_SAMPLE_RATE = float(os.getenv("SQL_LOG_SAMPLE_RATE", "0"))
+SQL_LOG_QUEUE_SIZE = int(os.getenv("SQL_LOG_QUEUE_SIZE", "10000"))
+
+current_route: ContextVar[str] = ContextVar("current_route", default="-")
+
+logger = logging.getLogger("finflow.sql")
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+_listener = None
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAM = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> tuple[str, str]:
+    # Sin literales ni parámetros: agrupa ejecuciones de la misma consulta y no filtra datos
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _BIND_PARAM.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (?)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+class RouteContextMiddleware:
+    # ASGI puro: guarda "MÉTODO /ruta" para que el log de SQL sepa qué request la originó
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_route.set(f'{scope["method"]} {scope["path"]}')
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_route.reset(token)
+
+
+def _start_listener():
+    # El request solo encola; el hilo del listener es el que escribe en stdout
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(maxsize=SQL_LOG_QUEUE_SIZE)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(log_queue, handler, respect_handler_level=False)
+    _listener.start()
+    logger.addHandler(_DroppingQueueHandler(log_queue))
+
+
+class _DroppingQueueHandler(QueueHandler):
+    # Si la cola se llena se descarta el registro en vez de bloquear el event loop
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def install(engine, name: str):
+    _start_listener()
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        slow = elapsed_ms >= SLOW_QUERY_MS
+        sampled = SQL_LOG_SAMPLE_RATE > 0 and random.random() < SQL_LOG_SAMPLE_RATE
+        if not (slow or sampled):
+            return
+
+        digest, normalized = fingerprint(statement)
+        entry = {
+            "event": "slow_query" if slow else "sampled_query",
+            "fingerprint": digest,
+            "duration_ms": round(elapsed_ms, 2),
+            "rows": cursor.rowcount,
+            "route": current_route.get(),
+            "engine": name,
+            # Nunca se registran los parámetros (montos, emails)
+            "statement": normalized,
+        }
+        if sampled:
+            entry["full_statement"] = statement
+        logger.info(json.dumps(entry, ensure_ascii=False))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(context):
+        # La consulta falló: se descarta su marca de inicio para no desalinear la pila
+        starts = context.connection.info.get("query_start") if context.connection else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import AsyncExitStack
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.revocation import revocation_list
+from app.data_version import get_data_version
+from app.database import DB_POOL_SIZE, engine, read_engine
+from app.models import RevokedToken, User
+from app.routes.dashboard import _month_transactions, _summary, _timeline, _totals
+
+logger = logging.getLogger(__name__)
+
+# Conexiones que se abren antes de declarar el worker listo (no más que pool_size:
+# las de overflow se cierran al devolverse)
+DB_WARMUP_CONNECTIONS = min(int(os.getenv("DB_WARMUP_CONNECTIONS", str(DB_POOL_SIZE))), DB_POOL_SIZE)
+DB_WARMUP_RETRY_SECONDS = float(os.getenv("DB_WARMUP_RETRY_SECONDS", "2"))
+
+# Usuario inexistente: las consultas no devuelven filas pero quedan preparadas
+_NO_USER = 0
+
+
+class Readiness:
+
+    def __init__(self):
+        self.ready = False
+        self.attempts = 0
+        self.last_error = None
+        self.warmed_connections = 0
+        self.duration_ms = None
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "warmed_connections": self.warmed_connections,
+            "duration_ms": self.duration_ms,
+        }
+
+
+readiness = Readiness()
+
+
+async def _prime(conn):
+    # Las mismas consultas que el camino caliente: asyncpg prepara cada sentencia e
+    # introspecciona sus tipos en esta conexión, y SQLAlchemy deja compilado su SQL
+    db = AsyncSession(bind=conn)
+    await db.execute(select(User).filter(User.email == ""))
+    await db.execute(select(User).where(User.id == _NO_USER))
+    await db.execute(select(RevokedToken.jti).where(RevokedToken.jti == ""))
+    await get_data_version(db, _NO_USER)
+    await _totals(db, _NO_USER)
+    await _timeline(db, _NO_USER, 90)
+    await _month_transactions(db, _NO_USER)
+    await _summary(db, _NO_USER)
+    await db.close()
+
+
+async def warm_engine(target, connections: int) -> int:
+    # Abre todas a la vez para que el pool realmente cree `connections` conexiones distintas
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(
+            *(stack.enter_async_context(target.connect()) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        errors = [conn for conn in opened if isinstance(conn, BaseException)]
+        if errors:
+            raise errors[0]
+        await asyncio.gather(*(_prime(conn) for conn in opened))
+    return len(opened)
+
+
+async def warm_up():
+    started = time.perf_counter()
+    # Primera carga del filtro de tokens revocados; después la repite run_rebuilder
+    if revocation_list.last_rebuild is None:
+        await revocation_list.rebuild()
+    warmed = await warm_engine(engine, DB_WARMUP_CONNECTIONS)
+    if read_engine is not None:
+        warmed += await warm_engine(read_engine, DB_WARMUP_CONNECTIONS)
+    readiness.warmed_connections = warmed
+    readiness.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    readiness.ready = True
+
+
+async def run_warmup():
+    # Reintenta hasta lograrlo: mientras tanto /readyz responde 503 y el balanceador no manda tráfico
+    while not readiness.ready:
+        readiness.attempts += 1
+        try:
+            await warm_up()
+        except Exception as e:
+            readiness.last_error = repr(e)
+            logger.exception("falló el calentamiento del pool, se reintenta")
+            await asyncio.sleep(DB_WARMUP_RETRY_SECONDS)
@@ -0,0 +1,121 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.imports import CsvStatementParser, OfxStatementParser, parse_amount
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("1234.56", 1234.56),
+        ("1.234,56", 1234.56),
+        ("1,234.56", 1234.56),
+        ("$ 12.500", 12500),
+        ("-$ 1.234", -1234),
+        ("1,234", 1234),
+        ("1.234.567", 1234567),
+        ("12,5", 12.5),
+        ("12.50", 12.5),
+        ("0.125", 0.125),
+        ("(123,45)", -123.45),
+        ("-12", -12),
+    ],
+)
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("1.234", 1234), ("12,50", 12.5), ("1.234,5", 1234.5), ("-3,000", -3)],
+)
+def test_parse_amount_decimal_comma(value, expected):
+    assert parse_amount(value, ",") == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", ["", "abc", "1,2,3", "--"])
+def test_parse_amount_invalid(value):
+    with pytest.raises(ValueError):
+        parse_amount(value, "," if value == "1,2,3" else None)
+
+
+def _parse_csv(text: str, chunk_size: int = 7):
+    parser = CsvStatementParser()
+    data = text.encode()
+    rows = []
+    for start in range(0, len(data), chunk_size):
+        rows += parser.feed(data[start:start + chunk_size])
+    rows += parser.close()
+    return parser, rows
+
+
+def test_csv_parser_comma_dialect():
+    parser, rows = _parse_csv(
+        "fecha,descripción,monto,tipo,categoría\n"
+        '05/01/2024,"Café, Juan",$ 12.500,gasto,Food\n'
+        "2024-01-06,Nómina,1234.56,ingreso,\n"
+    )
+    assert rows == [
+        (2, datetime(2024, 1, 5), "Café, Juan", 12500.0, "expense", "Food"),
+        (3, datetime(2024, 1, 6), "Nómina", 1234.56, "income", None),
+    ]
+    assert parser.rows == 2 and parser.error_count == 0
+
+
+def test_csv_parser_semicolon_uses_decimal_comma():
+    _, rows = _parse_csv("Date;Description;Amount\n05/01/2024;Arriendo;-1.234,50\n06/01/2024;Pan;3,5\n")
+    assert [(r[3], r[4]) for r in rows] == [(1234.5, "expense"), (3.5, "income")]
+
+
+def test_csv_parser_offset_dates_are_naive_utc():
+    _, rows = _parse_csv(
+        "date,description,amount\n2024-01-05T22:30:00-05:00,a,1\n2024-01-05T10:00:00Z,b,2\n"
+    )
+    assert [r[1] for r in rows] == [datetime(2024, 1, 6, 3, 30), datetime(2024, 1, 5, 10)]
+    assert all(r[1].tzinfo is None for r in rows)
+
+
+def test_csv_parser_multiline_quoted_record():
+    _, rows = _parse_csv(
+        'date,description,amount\n2024-01-05,"línea uno\nlínea dos",10\n2024-01-06,otra,-2\n',
+        chunk_size=3,
+    )
+    assert [r[2] for r in rows] == ["línea uno\nlínea dos", "otra"]
+    assert [r[0] for r in rows] == [3, 4]
+
+
+def test_csv_parser_reports_bad_rows():
+    parser, rows = _parse_csv(
+        "date,description,amount,type\n"
+        "ayer,x,10,\n"
+        "2024-01-05,x,diez,\n"
+        "2024-01-05,x,10,regalo\n"
+        "2024-01-05,ok,10,\n"
+    )
+    assert [r[2] for r in rows] == ["ok"]
+    assert parser.error_count == 3
+    assert [e["index"] for e in parser.errors] == [2, 3, 4]
+
+
+def test_csv_parser_missing_columns():
+    with pytest.raises(HTTPException) as exc:
+        _parse_csv("date,description\n2024-01-05,x\n")
+    assert exc.value.status_code == 400
+
+
+def test_ofx_parser_split_blocks():
+    parser = OfxStatementParser()
+    data = (
+        b"<OFX><STMTTRN><DTPOSTED>20240105120000[-5:EST]<TRNAMT>-12.500<NAME>Tienda</STMTTRN>"
+        b"<STMTTRN><DTPOSTED>20240106<TRNAMT>1500,5<NAME>Pago<MEMO>Nomina</STMTTRN></OFX>"
+    )
+    rows = []
+    for start in range(0, len(data), 5):
+        rows += parser.feed(data[start:start + 5])
+    rows += parser.close()
+    assert rows == [
+        (1, datetime(2024, 1, 5, 17), "Tienda", 12.5, "expense", None),
+        (2, datetime(2024, 1, 6), "Pago - Nomina", 1500.5, "income", None),
+    ]
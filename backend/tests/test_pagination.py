@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.pagination import decode_cursor, encode_cursor, naive_utc
+
+
+def test_naive_utc():
+    bogota = timezone(timedelta(hours=-5))
+    assert naive_utc(datetime(2024, 1, 1, 10, tzinfo=bogota)) == datetime(2024, 1, 1, 15)
+    assert naive_utc(datetime(2024, 1, 1, 10, tzinfo=timezone.utc)) == datetime(2024, 1, 1, 10)
+    assert naive_utc(datetime(2024, 1, 1, 10)) == datetime(2024, 1, 1, 10)
+    assert naive_utc(None) is None
+
+
+def test_cursor_round_trip():
+    moment = datetime(2024, 3, 5, 12, 30, 15, 123)
+    assert decode_cursor(encode_cursor(moment, 42)) == (moment, 42)
+
+
+def test_cursor_with_zone_is_naive_utc():
+    cursor = encode_cursor(datetime(2024, 3, 5, 12, tzinfo=timezone(timedelta(hours=2))), 7)
+    assert decode_cursor(cursor) == (datetime(2024, 3, 5, 10), 7)
+
+
+def test_invalid_cursor():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("no-es-un-cursor")
+    assert exc.value.status_code == 400
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from app.dedup import transaction_fingerprint
+from app.routes.transaction import transaction_row
+from app.schemas import TransactionCreate
+
+
+def _data(date: str) -> TransactionCreate:
+    return TransactionCreate.model_validate(
+        {"description": "Café", "amount": 12.5, "type": "expense", "category_id": 3, "date": date}
+    )
+
+
+def test_transaction_row_offset_date_is_naive_utc():
+    row = transaction_row(7, _data("2024-01-05T22:30:00-05:00"))
+    assert row["date"] == datetime(2024, 1, 6, 3, 30)
+    assert row["date"].tzinfo is None
+    # Huella (y día del rollup) sobre la fecha ya normalizada
+    assert row["fingerprint"] == transaction_fingerprint(7, datetime(2024, 1, 6), 12.5, "expense", "café")
+
+
+def test_transaction_row_z_suffix_matches_naive():
+    assert transaction_row(7, _data("2024-01-05T10:00:00Z")) == transaction_row(7, _data("2024-01-05T10:00:00"))
@@ -48,6 +48,8 @@ export function AddTransactionButton({ onTransactionAdded }: AddTransactionButto
     category_id: "",
     date: new Date().toISOString().split("T")[0],
   })
+  // Una clave por envío: si el usuario reintenta tras un error de red, el servidor no duplica
+  const [idempotencyKey, setIdempotencyKey] = useState(() => crypto.randomUUID())
 
   // 🔄 Traer categorías
   useEffect(() => {
@@ -97,6 +99,7 @@ export function AddTransactionButton({ onTransactionAdded }: AddTransactionButto
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKey,
         },
         credentials: "include",
         body: JSON.stringify({
@@ -113,11 +116,15 @@ export function AddTransactionButton({ onTransactionAdded }: AddTransactionButto
         throw new Error(err.detail || "Failed to create transaction")
       }
 
-      await response.json()
+      const created = await response.json()
 
       toast({
         title: "Transaction added",
-        description: `${formData.type === "income" ? "Income" : "Expense"} of $${formData.amount} has been added.`,
+        description:
+          `${formData.type === "income" ? "Income" : "Expense"} of $${formData.amount} has been added.` +
+          (created.possible_duplicate_of
+            ? " A transaction with the same date, amount and description already exists."
+            : ""),
       })
 
       // Reset form
@@ -129,6 +136,7 @@ export function AddTransactionButton({ onTransactionAdded }: AddTransactionButto
         date: new Date().toISOString().split("T")[0],
       })
 
+      setIdempotencyKey(crypto.randomUUID())
       setOpen(false)
 
       if (onTransactionAdded) onTransactionAdded()
@@ -25,7 +25,6 @@ import {
   DropdownMenuTrigger,
 } from "@/components/ui/dropdown-menu"
 import { Badge } from "@/components/ui/badge"
-import { exportToPdf } from "@/lib/export-pdf"
 import api from "@/lib/axios"
 
 type Transaction = {
@@ -37,6 +36,20 @@ type Transaction = {
   amount: number
 }
 
+type ApiTransaction = {
+  id: number
+  date: string
+  description: string
+  type: "income" | "expense"
+  amount: number
+  category: { id: number; name: string; type: string }
+}
+
+type Category = {
+  id: number
+  name: string
+}
+
 type Props = {
   showAll?: boolean
   newTransaction?: Transaction | null
@@ -63,42 +76,76 @@ const iconMap: Record<string, JSX.Element> = {
   Utilities: <HomeIcon className="h-4 w-4 text-rose-500" />,
 }
 
+const toTransaction = (t: ApiTransaction): Transaction => ({
+  id: t.id,
+  date: t.date,
+  description: t.description,
+  category: t.category.name,
+  type: t.type,
+  amount: t.amount,
+})
+
 export function RecentTransactions({ showAll = false, newTransaction = null }: Props) {
   const [transactions, setTransactions] = useState<Transaction[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [categories, setCategories] = useState<Category[]>([])
   const [searchTerm, setSearchTerm] = useState<string>("")
-  const [categoryFilter, setCategoryFilter] = useState<string[]>([])
+  const [categoryFilter, setCategoryFilter] = useState<number[]>([])
   const [typeFilter, setTypeFilter] = useState<("income" | "expense")[]>([])
 
   useEffect(() => {
+    if (!showAll) return
     api
-      .get("/dashboard")
-      .then((res) => {
-        const apiTransactions: Transaction[] = res.data.transactions || []
+      .get("/categories")
+      .then((res) => setCategories(res.data))
+      .catch(console.error)
+  }, [showAll])
+
+  // Tipo y categoría se filtran en el servidor; solo se pide una página
+  const params = {
+    limit: showAll ? 50 : 5,
+    type: typeFilter.length === 1 ? typeFilter[0] : undefined,
+    category_id: categoryFilter.length ? categoryFilter : undefined,
+  }
+
+  const loadPage = (cursor: string | null) =>
+    api.get("/transactions", { params: { ...params, cursor: cursor ?? undefined } }).then((res) => {
+      setNextCursor(res.data.next_cursor)
+      return (res.data.items as ApiTransaction[]).map(toTransaction)
+    })
 
+  useEffect(() => {
+    loadPage(null)
+      .then((page) => {
         const combined = newTransaction
-          ? [newTransaction, ...apiTransactions.filter(t => t.id !== newTransaction.id)]
-          : apiTransactions
+          ? [newTransaction, ...page.filter(t => t.id !== newTransaction.id)]
+          : page
 
         setTransactions(combined)
       })
       .catch(console.error)
-  }, [newTransaction])
-
-  const filteredTransactions = transactions.filter((transaction) => {
-    const matchesSearch =
-      transaction.description.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      transaction.category.toLowerCase().includes(searchTerm.toLowerCase())
+  }, [newTransaction, showAll, typeFilter, categoryFilter])
 
-    const matchesCategory =
-      categoryFilter.length === 0 || categoryFilter.includes(transaction.category)
-
-    const matchesType =
-      typeFilter.length === 0 || typeFilter.includes(transaction.type)
+  const loadMore = () => {
+    loadPage(nextCursor)
+      .then((page) => setTransactions((prev) => [...prev, ...page]))
+      .catch(console.error)
+  }
 
-    return matchesSearch && matchesCategory && matchesType
-  })
+  // El PDF lo arma el servidor por streaming con los mismos filtros (todas las páginas, no solo
+  // las cargadas); el navegador lo descarga directo sin pasar los datos por la pestaña
+  const exportTransactions = () => {
+    window.location.href = api.getUri({
+      url: "/transactions/export",
+      params: { ...params, limit: undefined, format: "pdf" },
+    })
+  }
 
-  const categories = [...new Set(transactions.map((t) => t.category))]
+  // La búsqueda de texto sigue siendo local, sobre las páginas ya cargadas
+  const filteredTransactions = transactions.filter((transaction) =>
+    transaction.description.toLowerCase().includes(searchTerm.toLowerCase()) ||
+    transaction.category.toLowerCase().includes(searchTerm.toLowerCase())
+  )
 
   const displayTransactions = showAll
     ? filteredTransactions
@@ -129,15 +176,15 @@ export function RecentTransactions({ showAll = false, newTransaction = null }: P
                 <div className="p-2 font-medium">Categories</div>
                 {categories.map((category) => (
                   <DropdownMenuCheckboxItem
-                    key={category}
-                    checked={categoryFilter.includes(category)}
+                    key={category.id}
+                    checked={categoryFilter.includes(category.id)}
                     onCheckedChange={(checked) => {
                       setCategoryFilter((prev) =>
-                        checked ? [...prev, category] : prev.filter((c) => c !== category)
+                        checked ? [...prev, category.id] : prev.filter((c) => c !== category.id)
                       )
                     }}
                   >
-                    {category}
+                    {category.name}
                   </DropdownMenuCheckboxItem>
                 ))}
                 <div className="p-2 font-medium">Type</div>
@@ -167,7 +214,7 @@ export function RecentTransactions({ showAll = false, newTransaction = null }: P
               variant="outline"
               size="sm"
               className="h-8 gap-1"
-              onClick={() => exportToPdf(filteredTransactions)}
+              onClick={exportTransactions}
             >
               <DownloadIcon className="h-3.5 w-3.5" />
               <span>Export</span>
@@ -223,6 +270,13 @@ export function RecentTransactions({ showAll = false, newTransaction = null }: P
           </TableBody>
         </Table>
       </div>
+      {showAll && nextCursor && (
+        <div className="flex justify-center">
+          <Button variant="outline" size="sm" onClick={loadMore}>
+            Cargar más
+          </Button>
+        </div>
+      )}
     </div>
   )
 }
@@ -14,7 +14,7 @@ export function TransactionStats() {
   const [monthlyData, setMonthlyData] = useState([])
 
   useEffect(() => {
-    fetch("http://localhost:8000/dashboard/", {
+    fetch("http://localhost:8000/dashboard/?include_transactions=true", {
         method: "GET",
         credentials: 'include',
          })
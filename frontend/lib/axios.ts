@@ -3,6 +3,35 @@ import axios from "axios"
 const api = axios.create({
   baseURL: "http://localhost:8000",
   withCredentials: true,
+  // Arrays como parámetros repetidos (?category_id=1&category_id=2), como los espera FastAPI
+  paramsSerializer: { indexes: null },
 })
 
+// Un solo refresh en vuelo: los 401 simultáneos (p. ej. las consultas paralelas del dashboard)
+// esperan la misma rotación en vez de presentar cada uno el refresh ya rotado
+let refreshing: Promise<unknown> | null = null
+
+const refreshSession = () => {
+  if (!refreshing) {
+    refreshing = api.post("/auth/refresh").finally(() => {
+      refreshing = null
+    })
+  }
+  return refreshing
+}
+
+// Si el access token expiró, rota el refresh token una vez y reintenta la petición
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config
+    if (error.response?.status === 401 && original && !original._retried && !original.url?.startsWith("/auth/")) {
+      original._retried = true
+      await refreshSession()
+      return api(original)
+    }
+    return Promise.reject(error)
+  }
+)
+
 export default api